@@ -0,0 +1,270 @@
+import asyncio
+import json
+import math
+import time
+from collections import OrderedDict
+from urllib.parse import parse_qs, urlsplit
+
+from indexes import RANK_KEYS, RankingIndex
+from pipeline import APPROX_MODE, DATA_PATH, build_neigh_df, dataset_fingerprint, read_listings
+from refresh import DataRefresher, read_version
+from scoring import value_score
+
+try:
+    import orjson
+except ImportError:  # stdlib encoder fallback
+    orjson = None
+
+RESPONSE_CACHE_SIZE = 4096
+MAX_LIMIT = 1000
+REASONS = {200: "OK", 304: "Not Modified", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed"}
+
+
+class ApiError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def dumps(obj):
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, allow_nan=False, separators=(",", ":")).encode()
+
+
+def _clean(value):
+    if isinstance(value, float) and not math.isfinite(value):
+        return None
+    if hasattr(value, "item"):
+        return _clean(value.item())
+    return value
+
+
+def records(df):
+    return [{key: _clean(value) for key, value in row.items()} for row in df.to_dict("records")]
+
+
+# Precomputed tables for one dataset version - shared by every request.
+# `version` is a pinned refresh.Version; without one the source is read directly.
+class ApiState:
+    def __init__(self, data_path=DATA_PATH, approx=APPROX_MODE, version=None):
+        self.data_path = data_path
+        if version is None:
+            self.version = dataset_fingerprint(data_path)
+            listings = read_listings(data_path)
+        else:
+            self.version = version.fingerprint
+            listings = read_version(version.path)
+        self.neigh_df = build_neigh_df(listings, approx=approx)
+        for col in ["neighbourhood_group", "neighbourhood"]:
+            self.neigh_df[col] = self.neigh_df[col].astype(str)
+        self.index = RankingIndex(self.neigh_df)
+        self.max_reviews_per_listing = float(self.neigh_df["reviews_per_listing"].max())
+        self.etag = f'"{self.version}"'
+
+
+def _arg(query, name, default=None, cast=str):
+    values = query.get(name)
+    if not values:
+        if default is None:
+            raise ApiError(400, f"Missing query parameter: {name}")
+        return default
+    try:
+        return cast(values[0])
+    except ValueError:
+        raise ApiError(400, f"Invalid value for {name}: {values[0]!r}") from None
+
+
+def _borough(state, query):
+    borough = _arg(query, "borough", "All")
+    if borough != "All" and borough not in state.index.boroughs:
+        raise ApiError(404, f"Unknown borough: {borough}")
+    return borough
+
+
+def _limit(query, name, default):
+    return max(0, min(_arg(query, name, default, int), MAX_LIMIT))
+
+
+# ==================== ENDPOINTS ====================
+def get_health(state, query):
+    return {"status": "ok", "version": state.version, "neighbourhoods": len(state.neigh_df)}
+
+
+def get_boroughs(state, query):
+    return {"version": state.version, "boroughs": state.index.boroughs}
+
+
+def get_rankings(state, query):
+    borough = _borough(state, query)
+    offset = max(0, _arg(query, "offset", 0, int))
+    limit = _limit(query, "limit", 100)
+    ranked = state.index.sorted(borough, "value_score")
+    return {
+        "version": state.version,
+        "borough": borough,
+        "total": len(ranked),
+        "offset": offset,
+        "rankings": records(ranked.iloc[offset:offset + limit]),
+    }
+
+
+def get_top(state, query):
+    borough = _borough(state, query)
+    metric = _arg(query, "metric", "value_score")
+    if metric not in RANK_KEYS:
+        raise ApiError(400, f"metric must be one of {', '.join(RANK_KEYS)}")
+    k = _limit(query, "k", 10)
+    order = _arg(query, "order", "desc")
+    if order not in ("desc", "asc"):
+        raise ApiError(400, "order must be desc or asc")
+    rows = state.index.top(borough, metric, k) if order == "desc" else state.index.bottom(borough, metric, k)
+    return {"version": state.version, "borough": borough, "metric": metric, "order": order, "results": records(rows)}
+
+
+def get_neighbourhood(state, query):
+    name = _arg(query, "name")
+    borough = _borough(state, query)
+    table = state.index.slice(borough)
+    rows = table[table["neighbourhood"] == name]
+    if rows.empty:
+        raise ApiError(404, f"Unknown neighbourhood: {name}")
+    return {"version": state.version, "results": records(rows)}
+
+
+# Same as the dashboard's Interactive Value Score Demo
+def _measure(query, name):
+    value = _arg(query, name, cast=float)
+    if not math.isfinite(value) or value < 0:
+        raise ApiError(400, f"{name} must be a finite, non-negative number")
+    return value
+
+
+def get_score(state, query):
+    availability = _measure(query, "availability")
+    reviews = _measure(query, "reviews_per_listing")
+    price = _measure(query, "price")
+    if price == 0:
+        raise ApiError(400, "price must be positive")
+    score = float(value_score(availability, reviews, price, state.max_reviews_per_listing))
+    return {
+        "version": state.version,
+        "value_score": _clean(score),
+        "percentile": _clean(float(state.index.percentile_of("All", "value_score", score))),
+    }
+
+
+ROUTES = {
+    "/health": get_health,
+    "/boroughs": get_boroughs,
+    "/rankings": get_rankings,
+    "/top": get_top,
+    "/neighbourhood": get_neighbourhood,
+    "/score": get_score,
+}
+
+
+# Minimal HTTP/1.1 server on asyncio streams with keep-alive. Responses are
+# pure functions of (dataset version, path, query), so their encoded bodies
+# are cached and conditional requests are answered from the ETag alone.
+# With a refresher, each request reads whichever ApiState was last published,
+# so a dataset swap never blocks or splits a response.
+class ApiServer:
+    def __init__(self, state=None, refresher=None):
+        self._state = state
+        self.refresher = refresher
+        self.requests = 0
+        self._responses = OrderedDict()
+
+    @property
+    def state(self):
+        if self.refresher is not None:
+            return self.refresher.current().data
+        return self._state
+
+    def respond(self, method, target, headers):
+        if method not in ("GET", "HEAD"):
+            return 405, {}, dumps({"error": "Only GET is supported"})
+        state = self.state
+        # Only successful responses are cached, so the route and query are
+        # validated before a conditional request can get a 304
+        key = (state.version, target)
+        body = self._responses.get(key)
+        if body is None:
+            url = urlsplit(target)
+            handler = ROUTES.get(url.path.rstrip("/") or "/")
+            if handler is None:
+                return 404, {}, dumps({"error": f"Unknown endpoint: {url.path}"})
+            try:
+                body = dumps(handler(state, parse_qs(url.query)))
+            except ApiError as exc:
+                return exc.status, {}, dumps({"error": str(exc)})
+            self._responses[key] = body
+            if len(self._responses) > RESPONSE_CACHE_SIZE:
+                self._responses.popitem(last=False)
+        else:
+            self._responses.move_to_end(key)
+        if headers.get("if-none-match") in (state.etag, "*"):
+            return 304, {"ETag": state.etag}, b""
+        return 200, {"ETag": state.etag, "Cache-Control": "no-cache"}, body
+
+    async def handle(self, reader, writer):
+        try:
+            while True:
+                head = await reader.readuntil(b"\r\n\r\n")
+                lines = head.decode("latin-1").split("\r\n")
+                method, target, version = lines[0].split(" ", 2)
+                headers = {}
+                for line in lines[1:]:
+                    if ":" in line:
+                        name, value = line.split(":", 1)
+                        headers[name.strip().lower()] = value.strip()
+                if int(headers.get("content-length", 0)):
+                    await reader.readexactly(int(headers["content-length"]))
+
+                status, extra, body = self.respond(method, target, headers)
+                self.requests += 1
+                keep_alive = headers.get("connection", "").lower() != "close" and version == "HTTP/1.1"
+                response = [f"HTTP/1.1 {status} {REASONS.get(status, '')}"]
+                if status != 304:
+                    response.append("Content-Type: application/json")
+                response.append(f"Content-Length: {len(body)}")
+                response.extend(f"{name}: {value}" for name, value in extra.items())
+                response.append(f"Connection: {'keep-alive' if keep_alive else 'close'}")
+                writer.write(("\r\n".join(response) + "\r\n\r\n").encode() + (b"" if method == "HEAD" else body))
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError, asyncio.LimitOverrunError):
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, host="127.0.0.1", port=8765):
+        server = await asyncio.start_server(self.handle, host, port)
+        async with server:
+            await server.serve_forever()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Local HTTP/JSON API over the neighbourhood value tables")
+    parser.add_argument("data", nargs="?", default=DATA_PATH, help="listings CSV (default: %(default)s)")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--no-refresh", action="store_true", help="do not pick up changes to the data file")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    if args.no_refresh:
+        api = ApiServer(ApiState(args.data))
+    else:
+        refresher = DataRefresher(args.data, build=lambda version: ApiState(args.data, version=version))
+        api = ApiServer(refresher=refresher.start())
+    print(f"Loaded dataset {api.state.version} in {time.perf_counter() - start:.2f}s; "
+          f"serving on http://{args.host}:{args.port}")
+    try:
+        asyncio.run(api.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
@@ -1,8 +1,22 @@
+import json
+
 import streamlit as st
 import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
-import numpy as np
+
+import charts
+import client_charts
+import diagnostics
+from artifacts import ArtifactGraph
+from cube import AggregateCube
+from exports import EXPORT_FORMATS, available_formats, materialize_export, read_file
+from indexes import RankingIndex
+from engine import ENGINE, open_engine
+from pipeline import APPROX_MODE, DATA_PATH, LOADER_MODE, borough_statistics, borough_summary, build_neigh_df
+from refresh import VERSIONS_KEPT, DataRefresher, read_version
+from scoring import value_score
+from spatial import SpatialIndex
+from stats import summarize_listings
+from whatif import COMPONENTS, WEIGHT_STEPS, WhatIfGrid, WhatIfScorer
 
 st.set_page_config(page_title="NYC Airbnb Value Dashboard", layout="wide", initial_sidebar_state="expanded")
 
@@ -106,42 +120,149 @@ st.markdown("""
     </style>
 """, unsafe_allow_html=True)
 
-# Load Data
-@st.cache_data
-def load_data():
-    df = pd.read_csv("AB_NYC_2019.csv")
-    df = df[df["price"] > 0].drop_duplicates()
-    return df
-
-df = load_data()
-
-# Feature Engineering - Enhanced Value Score
-neigh_df = df.groupby(
-    ["neighbourhood_group", "neighbourhood"]
-).agg(
-    avg_price=("price", "mean"),
-    min_price=("price", "min"),
-    max_price=("price", "max"),
-    avg_availability=("availability_365", "mean"),
-    total_reviews=("number_of_reviews", "sum"),
-    listings=("id", "count"),
-    room_type_diversity=("room_type", "nunique"),
-    avg_minimum_nights=("minimum_nights", "mean")
-).reset_index()
-
-neigh_df["reviews_per_listing"] = (
-    neigh_df["total_reviews"] / neigh_df["listings"]
-).fillna(0)
-
-# Enhanced Value Score Formula
-neigh_df["value_score"] = (
-    (neigh_df["avg_availability"] / 365) *  # Availability ratio
-    (neigh_df["reviews_per_listing"] / neigh_df["reviews_per_listing"].max()) *  # Review popularity
-    (1000 / neigh_df["avg_price"])  # Inverse price weight
-) * 100
-
-# Calculate percentile for ranking
-neigh_df["value_percentile"] = neigh_df["value_score"].rank(pct=True) * 100
+# Derived tables, materialised lazily per page and cached per dataset fingerprint;
+# each cache holds only as many versions as the refresher keeps pinned
+artifact_graph = ArtifactGraph()
+
+# Load Data - from the snapshot pinned for this version, never the live CSV
+if LOADER_MODE == "mmap":
+    # One shared read-only view per process instead of a pickled copy per session
+    @artifact_graph.artifact("listings")
+    @st.cache_resource(max_entries=VERSIONS_KEPT)
+    @diagnostics.computes
+    def load_data(fingerprint, _artifacts=None):
+        return read_version(get_refresher().path_for(fingerprint))
+else:
+    @artifact_graph.artifact("listings")
+    @st.cache_data(max_entries=VERSIONS_KEPT)
+    @diagnostics.computes
+    def load_data(fingerprint, _artifacts=None):
+        return read_version(get_refresher().path_for(fingerprint))
+
+# Embedded SQL engine over the pinned snapshot (NYC_AIRBNB_ENGINE); never
+# built in the default pandas mode
+@artifact_graph.artifact("engine", deps=["listings"])
+@st.cache_resource(max_entries=VERSIONS_KEPT)
+@diagnostics.computes
+def load_engine(fingerprint, _artifacts):
+    return open_engine(ENGINE, get_refresher().path_for(fingerprint), lambda: _artifacts["listings"])
+
+# Feature Engineering - cached per dataset fingerprint so reruns reuse it
+@artifact_graph.artifact("neigh_df", deps=["listings", "engine"])
+@st.cache_data(max_entries=VERSIONS_KEPT)
+@diagnostics.computes
+def load_neigh_df(fingerprint, _artifacts):
+    if ENGINE == "pandas":
+        return build_neigh_df(_artifacts["listings"], approx=APPROX_MODE)
+    return _artifacts["engine"].neigh_df(approx=APPROX_MODE)
+
+# Borough slices and ranking structures, shared read-only across sessions
+@artifact_graph.artifact("ranking_index", deps=["neigh_df"])
+@st.cache_resource(max_entries=VERSIONS_KEPT)
+@diagnostics.computes
+def load_borough_index(fingerprint, _artifacts):
+    return RankingIndex(_artifacts["neigh_df"])
+
+# Listing-level grid index for radius, nearest-listing and grid heatmap queries
+@artifact_graph.artifact("spatial_index", deps=["listings", "neigh_df"])
+@st.cache_resource(max_entries=VERSIONS_KEPT)
+@diagnostics.computes
+def load_spatial_index(fingerprint, _artifacts):
+    return SpatialIndex(_artifacts["listings"], _artifacts["neigh_df"]["reviews_per_listing"].max())
+
+# Borough x neighbourhood x room type x price band sums for roll-ups and drill-downs
+@artifact_graph.artifact("cube", deps=["listings", "neigh_df"])
+@st.cache_resource(max_entries=VERSIONS_KEPT)
+@diagnostics.computes
+def load_cube(fingerprint, _artifacts):
+    return AggregateCube.from_listings(
+        _artifacts["listings"], max_reviews_per_listing=_artifacts["neigh_df"]["reviews_per_listing"].max()
+    )
+
+# Log score components for what-if re-weighting, plus the optional weight grid
+@artifact_graph.artifact("whatif", deps=["neigh_df"])
+@st.cache_resource(max_entries=VERSIONS_KEPT)
+@diagnostics.computes
+def load_whatif(fingerprint, _artifacts):
+    return WhatIfScorer(_artifacts["neigh_df"])
+
+@artifact_graph.artifact("whatif_grid", deps=["whatif"])
+@st.cache_resource(max_entries=VERSIONS_KEPT)
+@diagnostics.computes
+def load_whatif_grid(fingerprint, _artifacts):
+    return WhatIfGrid(_artifacts["whatif"])
+
+# Read off the listings' categories so pages without neighbourhood tables
+# never run the aggregate just to fill the borough filter
+@artifact_graph.artifact("boroughs", deps=["listings"])
+@st.cache_data(max_entries=VERSIONS_KEPT)
+@diagnostics.computes
+def load_boroughs(fingerprint, _artifacts):
+    return sorted(_artifacts["listings"]["neighbourhood_group"].cat.categories.astype(str))
+
+# Dataset Summary statistics in one fused pass per column
+@artifact_graph.artifact("listing_summary", deps=["listings"])
+@st.cache_data(max_entries=VERSIONS_KEPT)
+@diagnostics.computes
+def load_listing_summary(fingerprint, _artifacts):
+    return summarize_listings(_artifacts["listings"], approx=APPROX_MODE)
+
+@artifact_graph.artifact("borough_stats", deps=["listings", "engine"])
+@st.cache_data(max_entries=VERSIONS_KEPT)
+@diagnostics.computes
+def load_borough_stats(fingerprint, _artifacts):
+    if ENGINE == "pandas":
+        return borough_statistics(_artifacts["listings"])
+    return _artifacts["engine"].borough_stats()
+
+# Fill every artifact cache for a new version before it is published, so the
+# first rerun after a swap is all cache hits
+def warm_artifacts(version):
+    artifacts = artifact_graph.bind(version.fingerprint, list(artifact_graph.loaders))
+    for name in artifact_graph.loaders:
+        artifacts[name]
+
+# Watches DATA_PATH and swaps in rebuilt versions; the first version is built
+# lazily by the page that needs it, as before
+@st.cache_resource
+def get_refresher():
+    return DataRefresher(DATA_PATH, build=warm_artifacts, build_initial=False).start()
+
+fingerprint = get_refresher().current().fingerprint
+
+# Per-stage timings, allocations and cache outcomes for this rerun
+run = diagnostics.RunRecorder(version=fingerprint).start()
+
+# Rendered chart bytes shared across sessions, keyed by chart + filter + data version
+@st.cache_resource
+def get_chart_cache():
+    return charts.FigureCache()
+
+# client builds (data, spec) for st.vega_lite_chart when CHART_MODE is "client"
+def show_chart(kind, borough_filter, draw, client=None):
+    if client is not None and charts.CHART_MODE == "client":
+        with diagnostics.stage(kind, "chart", cached=False) as record:
+            data, spec = client()
+            record["rows"] = len(data)
+            record["output_bytes"] = diagnostics.output_size(data)
+            st.vega_lite_chart(data, spec, use_container_width=True)
+        return
+    with diagnostics.stage(kind, "chart") as record:
+        data = get_chart_cache().get_or_render((kind, borough_filter, fingerprint), diagnostics.computes(draw))
+        record["output_bytes"] = len(data)
+        with diagnostics.stage(f"{kind}.image", "chart", cached=False):
+            st.image(data, use_container_width=True)
+
+# Artifacts each page reads - nothing else is built while it is shown
+PAGE_ARTIFACTS = {
+    "📊 Dataset Summary": ["boroughs", "listing_summary", "borough_stats"],
+    "🧮 Value Score Computation": ["boroughs", "neigh_df", "ranking_index", "whatif", "whatif_grid"],
+    "🏆 Neighbourhood Rankings": ["boroughs", "ranking_index"],
+    "🗺️ Interactive Borough Explorer": ["boroughs", "ranking_index", "spatial_index", "cube"],
+    "💬 Smart Insights": ["boroughs", "ranking_index", "engine"],
+}
+
+EXPORT_LABELS = {"csv": "CSV", "csv.gz": "CSV gzip", "parquet": "Parquet", "arrow": "Arrow"}
 
 # Dashboard Title
 st.title("🏙️ NYC Airbnb Neighbourhood Value Dashboard")
@@ -152,40 +273,29 @@ st.markdown(
 
 # Sidebar Navigation
 st.sidebar.title("📍 Navigation")
-page = st.sidebar.radio(
-    "Select Section",
-    [
-        "📊 Dataset Summary",
-        "🧮 Value Score Computation",
-        "🏆 Neighbourhood Rankings",
-        "🗺️ Interactive Borough Explorer",
-        "💬 Smart Insights"
-    ]
-)
+page = st.sidebar.radio("Select Section", list(PAGE_ARTIFACTS))
+run.page = page
+artifacts = artifact_graph.bind(fingerprint, PAGE_ARTIFACTS[page])
 
 # Sidebar Filters
 st.sidebar.markdown("---")
 st.sidebar.title("🔍 Filters")
 borough = st.sidebar.selectbox(
     "Select Borough",
-    ["All"] + sorted(neigh_df["neighbourhood_group"].unique())
+    ["All"] + artifacts["boroughs"]
 )
 
-if borough != "All":
-    filtered = neigh_df[neigh_df["neighbourhood_group"] == borough].copy()
-else:
-    filtered = neigh_df.copy()
-
 # ==================== PAGE 1: DATASET SUMMARY ====================
 if page == "📊 Dataset Summary":
     st.header("📊 Dataset Overview & Statistics")
+    summary = artifacts["listing_summary"]
     
     col1, col2, col3, col4 = st.columns(4)
     with col1:
         st.markdown(f"""
         <div class="metric-card">
         <h3 style="font-size: 2.5em; margin: 0;">📍</h3>
-        <p style="font-size: 1.2em; margin: 10px 0 0 0;">{len(df):,}</p>
+        <p style="font-size: 1.2em; margin: 10px 0 0 0;">{summary["listings"]:,}</p>
         <p style="font-size: 0.9em; margin: 5px 0 0 0;">Total Listings</p>
         </div>
         """, unsafe_allow_html=True)
@@ -194,7 +304,7 @@ if page == "📊 Dataset Summary":
         st.markdown(f"""
         <div class="metric-card">
         <h3 style="font-size: 2.5em; margin: 0;">🏘️</h3>
-        <p style="font-size: 1.2em; margin: 10px 0 0 0;">{df["neighbourhood"].nunique()}</p>
+        <p style="font-size: 1.2em; margin: 10px 0 0 0;">{summary["neighbourhoods"]}</p>
         <p style="font-size: 0.9em; margin: 5px 0 0 0;">Neighbourhoods</p>
         </div>
         """, unsafe_allow_html=True)
@@ -203,7 +313,7 @@ if page == "📊 Dataset Summary":
         st.markdown(f"""
         <div class="metric-card">
         <h3 style="font-size: 2.5em; margin: 0;">🏙️</h3>
-        <p style="font-size: 1.2em; margin: 10px 0 0 0;">{df["neighbourhood_group"].nunique()}</p>
+        <p style="font-size: 1.2em; margin: 10px 0 0 0;">{summary["boroughs"]}</p>
         <p style="font-size: 0.9em; margin: 5px 0 0 0;">Boroughs</p>
         </div>
         """, unsafe_allow_html=True)
@@ -212,7 +322,7 @@ if page == "📊 Dataset Summary":
         st.markdown(f"""
         <div class="metric-card">
         <h3 style="font-size: 2.5em; margin: 0;">💰</h3>
-        <p style="font-size: 1.2em; margin: 10px 0 0 0;">${df['price'].mean():.0f}</p>
+        <p style="font-size: 1.2em; margin: 10px 0 0 0;">${summary['price_mean']:.0f}</p>
         <p style="font-size: 0.9em; margin: 5px 0 0 0;">Avg Nightly Rate</p>
         </div>
         """, unsafe_allow_html=True)
@@ -224,30 +334,20 @@ if page == "📊 Dataset Summary":
     
     with col1:
         st.subheader("💰 Price Statistics")
-        fig, ax = plt.subplots(figsize=(10, 5))
-        price_data = [df['price'].min(), df['price'].quantile(0.25), 
-                     df['price'].median(), df['price'].quantile(0.75), df['price'].max()]
-        labels = ['Min', 'Q1', 'Median', 'Q3', 'Max']
-        colors = ['#ff6b6b', '#ffa94d', '#51cf66', '#4d96ff', '#667eea']
-        bars = ax.bar(labels, price_data, color=colors, edgecolor='black', linewidth=2)
-        ax.set_ylabel("Price ($)", fontsize=12, fontweight='bold')
-        ax.set_title("Price Distribution", fontsize=14, fontweight='bold')
-        for bar in bars:
-            height = bar.get_height()
-            ax.text(bar.get_x() + bar.get_width()/2., height,
-                   f'${int(height)}', ha='center', va='bottom', fontweight='bold')
-        plt.tight_layout()
-        st.pyplot(fig)
+        show_chart("price_distribution", "All", lambda: charts.price_distribution(
+            [summary['price_min'], summary['price_q1'],
+             summary['price_median'], summary['price_q3'], summary['price_max']]
+        ))
     
     with col2:
         st.subheader("📅 Key Metrics")
         metrics_data = {
-            "🔢 Std Dev Price": f"${df['price'].std():.2f}",
-            "📈 IQR": f"${df['price'].quantile(0.75) - df['price'].quantile(0.25):.2f}",
-            "⭐ Avg Availability": f"{df['availability_365'].mean():.0f} days",
-            "👥 Avg Reviews": f"{(df['number_of_reviews'].sum() / len(df)):.1f}/listing",
-            "🏠 Most Common Room": df['room_type'].mode()[0],
-            "📊 Total Reviews": f"{df['number_of_reviews'].sum():,}"
+            "🔢 Std Dev Price": f"${summary['price_std']:.2f}",
+            "📈 IQR": f"${summary['price_iqr']:.2f}",
+            "⭐ Avg Availability": f"{summary['availability_mean']:.0f} days",
+            "👥 Avg Reviews": f"{summary['reviews_per_listing']:.1f}/listing",
+            "🏠 Most Common Room": summary['most_common_room'],
+            "📊 Total Reviews": f"{summary['reviews_total']:,}"
         }
         for key, value in metrics_data.items():
             st.markdown(f"**{key}:** `{value}`")
@@ -256,13 +356,7 @@ if page == "📊 Dataset Summary":
     
     # Borough Breakdown with visualization
     st.subheader("🏙️ Borough Deep Dive")
-    borough_stats = df.groupby("neighbourhood_group").agg({
-        "id": "count",
-        "price": ["mean", "min", "max"],
-        "availability_365": "mean",
-        "number_of_reviews": "sum"
-    }).round(2)
-    borough_stats.columns = ["Listings", "Avg Price", "Min Price", "Max Price", "Avg Availability", "Total Reviews"]
+    borough_stats = artifacts["borough_stats"]
     
     col1, col2 = st.columns([1.5, 1])
     
@@ -270,16 +364,13 @@ if page == "📊 Dataset Summary":
         st.dataframe(borough_stats, use_container_width=True)
     
     with col2:
-        fig, ax = plt.subplots(figsize=(8, 5))
-        borough_colors = ['#667eea', '#764ba2', '#f093fb', '#4158d0', '#c471ed']
-        ax.pie(borough_stats['Listings'], labels=borough_stats.index, autopct='%1.1f%%',
-              colors=borough_colors, explode=[0.05]*len(borough_stats), startangle=90)
-        ax.set_title("Listings Distribution", fontsize=12, fontweight='bold')
-        st.pyplot(fig)
+        show_chart("borough_pie", "All", lambda: charts.borough_pie(borough_stats))
 
 # ==================== PAGE 2: VALUE SCORE COMPUTATION ====================
 elif page == "🧮 Value Score Computation":
     st.header("🧮 Value Score Formula & Methodology")
+    neigh_df = artifacts["neigh_df"]
+    borough_index = artifacts["ranking_index"]
     
     st.markdown("""
     ### How We Calculate Value Score
@@ -314,26 +405,61 @@ elif page == "🧮 Value Score Computation":
         demo_price = st.slider("Avg Nightly Price ($)", 50, 500, 150)
     
     # Calculate demo score
-    demo_score = (
-        (demo_avail / 365) *
-        (demo_reviews / neigh_df["reviews_per_listing"].max()) *
-        (1000 / demo_price)
-    ) * 100
+    demo_score = value_score(
+        demo_avail, demo_reviews, demo_price,
+        max_reviews_per_listing=neigh_df["reviews_per_listing"].max()
+    )
     
     st.metric("Calculated Value Score", f"{demo_score:.2f}")
     
     # Show real examples
     st.markdown("---")
     st.subheader("📈 Real Examples from Data")
-    top_examples = filtered.nlargest(5, "value_score")[
+    top_examples = borough_index.top(borough, "value_score", 5)[
         ["neighbourhood", "avg_price", "avg_availability", "reviews_per_listing", "value_score"]
     ].reset_index(drop=True)
     top_examples.columns = ["Neighbourhood", "Avg Price ($)", "Availability (days)", "Reviews/Listing", "Value Score"]
     st.dataframe(top_examples, use_container_width=True)
+    
+    # What-if weights - every neighbourhood re-scored and re-ranked per change
+    st.markdown("---")
+    st.subheader("⚖️ What-if Component Weights")
+    st.markdown(
+        "Raise a component's exponent to make it count more, or set it to 0 to ignore it: "
+        "`Score = 100 × Availability^a × Popularity^p × Price Efficiency^e`"
+    )
+    whatif = artifacts["whatif"]
+    component_labels = {"availability": "Availability", "popularity": "Popularity", "price_efficiency": "Price Efficiency"}
+    
+    cols = st.columns(len(COMPONENTS) + 1)
+    weights = []
+    for col, component in zip(cols, COMPONENTS):
+        with col:
+            weights.append(st.slider(f"{component_labels[component]} exponent", 0.0, 2.0, 1.0, 0.05, key=f"weight_{component}"))
+    with cols[-1]:
+        use_grid = st.checkbox("Snap to precomputed grid", value=True, help=(
+            f"Scores for all {len(WEIGHT_STEPS) ** len(COMPONENTS)} combinations of "
+            f"{WEIGHT_STEPS[1]:g}-step exponents are computed once and looked up"
+        ))
+    
+    if use_grid:
+        weights, whatif_scores = artifacts["whatif_grid"].scores(weights)
+        st.caption(f"Using grid weights: {', '.join(f'{w:g}' for w in weights)}")
+    else:
+        whatif_scores = whatif.scores(weights)
+    
+    reranked = whatif.ranking(whatif_scores, borough, 10)[
+        ["neighbourhood", "neighbourhood_group", "value_score", "what_if_score", "what_if_rank", "rank_change"]
+    ]
+    reranked.columns = ["Neighbourhood", "Borough", "Value Score", "What-if Score", "What-if Rank", "Rank Change"]
+    reranked.index = reranked.index + 1
+    st.dataframe(reranked.round(2), use_container_width=True)
 
 # ==================== PAGE 3: NEIGHBOURHOOD RANKINGS ====================
 elif page == "🏆 Neighbourhood Rankings":
     st.header("🏆 Neighbourhood Rankings & Analysis")
+    borough_index = artifacts["ranking_index"]
+    filtered = borough_index.slice(borough)
     
     # KPIs with custom styling
     col1, col2, col3, col4 = st.columns(4)
@@ -379,7 +505,7 @@ elif page == "🏆 Neighbourhood Rankings":
     
     with col1:
         st.subheader("📊 Complete Value Score Rankings")
-        ranking_table = filtered.sort_values("value_score", ascending=False)[
+        ranking_table = borough_index.sorted(borough, "value_score")[
             ["neighbourhood", "listings", "avg_price", "avg_availability", "reviews_per_listing", "value_score"]
         ].reset_index(drop=True)
         ranking_table.columns = ["Neighbourhood", "Listings", "Avg Price ($)", "Availability (days)", "Reviews/Listing", "Value Score"]
@@ -389,41 +515,19 @@ elif page == "🏆 Neighbourhood Rankings":
     
     with col2:
         st.subheader("📈 Score Distribution")
-        fig, ax = plt.subplots(figsize=(7, 5))
-        ax.hist(filtered["value_score"], bins=20, color='#667eea', edgecolor='black', linewidth=1.5, alpha=0.7)
-        ax.set_xlabel("Value Score", fontweight='bold')
-        ax.set_ylabel("Count", fontweight='bold')
-        ax.set_title("Distribution", fontweight='bold')
-        ax.grid(axis='y', alpha=0.3)
-        st.pyplot(fig)
+        show_chart("score_histogram", borough, lambda: charts.score_histogram(filtered),
+                   client=lambda: client_charts.score_histogram(filtered))
     
     st.markdown("<div class='section-divider'></div>", unsafe_allow_html=True)
     
     # Top Undervalued with enhanced design
     st.subheader("🏆 Top 10 Most Undervalued Neighbourhoods")
-    top10 = filtered.nlargest(10, "value_score")
+    top10 = borough_index.top(borough, "value_score", 10)
     
     col1, col2 = st.columns(2)
     
     with col1:
-        fig, ax = plt.subplots(figsize=(10, 7))
-        y_pos = np.arange(len(top10))
-        colors_gradient = plt.cm.RdYlGn(np.linspace(0.3, 0.9, len(top10)))
-        bars = ax.barh(y_pos, top10["value_score"].values, color=colors_gradient, edgecolor='black', linewidth=1.5)
-        ax.set_yticks(y_pos)
-        ax.set_yticklabels(top10["neighbourhood"].values, fontweight='bold')
-        ax.set_xlabel("Value Score", fontweight='bold', fontsize=12)
-        ax.set_title("🏆 Top 10 Undervalued Neighbourhoods", fontweight='bold', fontsize=14)
-        ax.invert_yaxis()
-        
-        # Add value labels
-        for i, bar in enumerate(bars):
-            width = bar.get_width()
-            ax.text(width + 0.1, bar.get_y() + bar.get_height()/2, 
-                   f'{width:.2f}', ha='left', va='center', fontweight='bold')
-        
-        ax.grid(axis='x', alpha=0.3)
-        st.pyplot(fig)
+        show_chart("top10_barh", borough, lambda: charts.top10_barh(top10))
     
     with col2:
         st.subheader("💎 Detailed Metrics")
@@ -439,38 +543,22 @@ elif page == "🏆 Neighbourhood Rankings":
     
     # Enhanced scatter plot
     st.subheader("💎 Price vs Value Analysis")
-    fig, ax = plt.subplots(figsize=(14, 7))
-    scatter = ax.scatter(
-        filtered["avg_price"],
-        filtered["value_score"],
-        s=filtered["listings"]*3,
-        c=filtered["reviews_per_listing"],
-        cmap='RdYlGn',
-        alpha=0.6,
-        edgecolors='black',
-        linewidth=1.5
-    )
-    ax.set_xlabel("Average Price ($)", fontweight='bold', fontsize=12)
-    ax.set_ylabel("Value Score", fontweight='bold', fontsize=12)
-    ax.set_title("Price vs Value Score (Bubble size = Listings, Color = Reviews/Listing)", 
-                fontweight='bold', fontsize=14)
-    ax.grid(True, alpha=0.3)
-    cbar = plt.colorbar(scatter, ax=ax)
-    cbar.set_label("Reviews per Listing", fontweight='bold')
-    st.pyplot(fig)
+    show_chart("price_value_scatter", borough, lambda: charts.price_value_scatter(filtered),
+               client=lambda: client_charts.price_value_scatter(filtered))
 
 # ==================== PAGE 4: INTERACTIVE BOROUGH EXPLORER ====================
 elif page == "🗺️ Interactive Borough Explorer":
     st.header("🗺️ Interactive Borough Insights Explorer")
+    borough_index = artifacts["ranking_index"]
     
     # Borough Selection
     selected_borough = st.selectbox(
         "📍 Select a Borough to Explore",
-        sorted(neigh_df["neighbourhood_group"].unique()),
+        artifacts["boroughs"],
         key="borough_selector"
     )
     
-    borough_data = neigh_df[neigh_df["neighbourhood_group"] == selected_borough]
+    borough_data = borough_index.slice(selected_borough)
     
     # Borough KPIs with custom styling
     st.markdown(f"## 🏙️ {selected_borough} - Neighbourhood Analysis")
@@ -519,7 +607,7 @@ elif page == "🗺️ Interactive Borough Explorer":
     
     with col1:
         st.subheader("🌟 Top Neighbourhoods by Value")
-        top_neigh = borough_data.nlargest(8, "value_score")[
+        top_neigh = borough_index.top(selected_borough, "value_score", 8)[
             ["neighbourhood", "avg_price", "value_score", "listings"]
         ].reset_index(drop=True)
         top_neigh.index = top_neigh.index + 1
@@ -528,40 +616,95 @@ elif page == "🗺️ Interactive Borough Explorer":
     
     with col2:
         st.subheader("💰 Price Range by Listing Volume")
-        fig, ax = plt.subplots(figsize=(10, 6))
-        top_by_listings = borough_data.nlargest(8, "listings")
-        colors = plt.cm.Spectral(np.linspace(0, 1, len(top_by_listings)))
-        bars = ax.barh(top_by_listings["neighbourhood"], top_by_listings["avg_price"], 
-                      color=colors, edgecolor='black', linewidth=1.5)
-        ax.set_xlabel("Average Price ($)", fontweight='bold')
-        ax.set_title(f"{selected_borough} - Top 8 by Volume", fontweight='bold', fontsize=12)
-        
-        for bar in bars:
-            width = bar.get_width()
-            ax.text(width + 5, bar.get_y() + bar.get_height()/2, 
-                   f'${int(width)}', ha='left', va='center', fontweight='bold')
-        
-        st.pyplot(fig)
+        show_chart("volume_barh", selected_borough, lambda: charts.volume_barh(
+            borough_index.top(selected_borough, "listings", 8), selected_borough
+        ))
     
     st.markdown("<div class='section-divider'></div>", unsafe_allow_html=True)
     
     # Heatmap View
     st.subheader("🔥 Metrics Performance Heatmap")
-    heatmap_data = borough_data.nlargest(10, "listings")[
-        ["neighbourhood", "avg_price", "avg_availability", "reviews_per_listing", "value_score"]
-    ].set_index("neighbourhood")
+    spatial_index = artifacts["spatial_index"]
+    heatmap_view = st.radio("Heatmap view", ["Grid cells", "Top neighbourhoods"], horizontal=True)
+    def draw_heatmap():
+        heatmap_data = borough_index.top(selected_borough, "listings", 10)[
+            ["neighbourhood", "avg_price", "avg_availability", "reviews_per_listing", "value_score"]
+        ].set_index("neighbourhood")
+        
+        # Normalize for heatmap
+        heatmap_normalized = (heatmap_data - heatmap_data.min()) / (heatmap_data.max() - heatmap_data.min())
+        return charts.metrics_heatmap(heatmap_normalized, selected_borough)
+    
+    if heatmap_view == "Grid cells":
+        cell_metres = st.select_slider("Cell size (m)", [250, 500, 1000, 2000], value=500)
+        show_chart(f"grid_heatmap_{cell_metres}", selected_borough, lambda: charts.grid_heatmap(
+            spatial_index.grid(cell_metres, selected_borough), selected_borough, cell_metres
+        ))
+    else:
+        show_chart("metrics_heatmap", selected_borough, draw_heatmap)
+    
+    st.markdown("<div class='section-divider'></div>", unsafe_allow_html=True)
+    
+    # Radius and nearest-listing search on the spatial index
+    st.subheader("📍 Value Around a Location")
+    centre_lat, centre_lon = spatial_index.centres.get(selected_borough, (spatial_index.lat0, spatial_index.lon0))
+    room_types = sorted(map(str, spatial_index.room_types))
+    
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        lat = st.number_input("Latitude", value=float(centre_lat), format="%.5f", key=f"lat_{selected_borough}")
+    with col2:
+        lon = st.number_input("Longitude", value=float(centre_lon), format="%.5f", key=f"lon_{selected_borough}")
+    with col3:
+        radius = st.slider("Radius (m)", 100, 5000, 1000, step=100)
+    with col4:
+        room_type = st.selectbox("Room type", ["Any"] + room_types)
+    room_type = None if room_type == "Any" else room_type
     
-    # Normalize for heatmap
-    heatmap_normalized = (heatmap_data - heatmap_data.min()) / (heatmap_data.max() - heatmap_data.min())
+    nearby = spatial_index.radius_summary(lat, lon, radius, room_type)
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("Listings in radius", f"{nearby['listings']:,}")
+    col2.metric("Avg Price", f"${nearby['avg_price']:.0f}" if nearby["listings"] else "–")
+    col3.metric("Value Score", f"{nearby['value_score']:.2f}" if nearby["listings"] else "–")
+    col4.metric(
+        "Percentile vs Neighbourhoods",
+        f"{borough_index.percentile_of('All', 'value_score', nearby['value_score']):.0f}%"
+        if pd.notna(nearby["value_score"]) else "–"
+    )
     
-    fig, ax = plt.subplots(figsize=(12, 7))
-    sns.heatmap(heatmap_normalized.T, annot=True, fmt='.2f', cmap='RdYlGn', 
-                cbar_kws={'label': 'Normalized Value (0-1)'}, ax=ax, 
-                linewidths=2, linecolor='white', cbar=True)
-    ax.set_title(f"📊 Metrics Heatmap - {selected_borough} Top Neighbourhoods", 
-                fontweight='bold', fontsize=14)
-    ax.set_ylabel("Metrics", fontweight='bold')
-    st.pyplot(fig)
+    st.markdown("**🔎 10 Nearest Comparable Listings**")
+    nearest = spatial_index.nearest(lat, lon, 10, room_type)[
+        ["neighbourhood", "room_type", "price", "availability_365", "number_of_reviews", "distance_m", "value_score"]
+    ]
+    nearest.columns = ["Neighbourhood", "Room Type", "Price ($)", "Availability (days)", "Reviews", "Distance (m)", "Value Score"]
+    nearest.index = nearest.index + 1
+    st.dataframe(nearest.round({"Distance (m)": 0, "Value Score": 2}), use_container_width=True)
+    
+    st.markdown("<div class='section-divider'></div>", unsafe_allow_html=True)
+    
+    # Roll-ups and drill-downs answered from the aggregate cube
+    st.subheader("🛏️ Room Type & Price Band Breakdown")
+    cube = artifacts["cube"].slice(neighbourhood_group=selected_borough)
+    dimension_labels = {"neighbourhood": "Neighbourhood", "room_type": "Room Type", "price_band": "Price Band"}
+    
+    col1, col2 = st.columns([1, 2])
+    with col1:
+        breakdown = st.multiselect(
+            "Break down by", list(dimension_labels), default=["room_type"],
+            format_func=lambda dim: dimension_labels[dim]
+        )
+        drill_room = st.selectbox("Room type", ["All"] + cube.values("room_type"), key="cube_room_type")
+        drill_band = st.selectbox("Price band", ["All"] + cube.values("price_band"), key="cube_price_band")
+    with col2:
+        cube_table = cube.rollup(breakdown, room_type=drill_room, price_band=drill_band)
+        cube_table = cube_table.sort_values("value_score", ascending=False, kind="stable")[
+            breakdown + ["listings", "avg_price", "avg_availability", "reviews_per_listing", "value_score"]
+        ].reset_index(drop=True)
+        cube_table.columns = [dimension_labels[dim] for dim in breakdown] + [
+            "Listings", "Avg Price ($)", "Availability (days)", "Reviews/Listing", "Value Score"
+        ]
+        cube_table.index = cube_table.index + 1
+        st.dataframe(cube_table.round(2), use_container_width=True, height=300)
     
     st.markdown("")
     
@@ -571,7 +714,7 @@ elif page == "🗺️ Interactive Borough Explorer":
     col1, col2 = st.columns(2)
     
     with col1:
-        best_value = borough_data.loc[borough_data["value_score"].idxmax()]
+        best_value = borough_index.argmax(selected_borough, "value_score")
         st.markdown(f"""
         <div class="insight-card">
         
@@ -588,7 +731,7 @@ elif page == "🗺️ Interactive Borough Explorer":
         """, unsafe_allow_html=True)
     
     with col2:
-        most_expensive = borough_data.loc[borough_data["avg_price"].idxmax()]
+        most_expensive = borough_index.argmax(selected_borough, "avg_price")
         st.markdown(f"""
         <div class="insight-card">
         
@@ -607,15 +750,17 @@ elif page == "🗺️ Interactive Borough Explorer":
 # ==================== PAGE 5: SMART INSIGHTS ====================
 else:  # page == "💬 Smart Insights"
     st.header("💬 Smart Insights & AI-Powered Recommendations")
+    borough_index = artifacts["ranking_index"]
+    filtered = borough_index.slice(borough)
     
     st.markdown("<div class='section-divider'></div>", unsafe_allow_html=True)
     
     st.subheader("🎯 Real-Time Market Analysis")
     
     # Calculate insights
-    overall_best = filtered.loc[filtered["value_score"].idxmax()]
-    overall_worst = filtered.loc[filtered["value_score"].idxmin()]
-    price_range = filtered["avg_price"].max() - filtered["avg_price"].min()
+    overall_best = borough_index.argmax(borough, "value_score")
+    overall_worst = borough_index.argmin(borough, "value_score")
+    price_range = borough_index.quantile(borough, "avg_price", 1) - borough_index.quantile(borough, "avg_price", 0)
     
     # Insight 1: Top Undervalued
     st.markdown(f"""
@@ -643,8 +788,8 @@ else:  # page == "💬 Smart Insights"
     st.markdown("")
     
     # Insight 2: Price Analysis
-    high_price_neigh = filtered.loc[filtered["avg_price"].idxmax()]
-    low_price_neigh = filtered.loc[filtered["avg_price"].idxmin()]
+    high_price_neigh = borough_index.argmax(borough, "avg_price")
+    low_price_neigh = borough_index.argmin(borough, "avg_price")
     
     col1, col2 = st.columns(2)
     
@@ -685,7 +830,7 @@ else:  # page == "💬 Smart Insights"
     st.markdown("")
     
     # Insight 3: Market Trends
-    high_demand = filtered.nlargest(3, "reviews_per_listing")
+    high_demand = borough_index.top(borough, "reviews_per_listing", 3)
     
     st.markdown(f"""
     <div class="insight-card">
@@ -779,7 +924,9 @@ else:  # page == "💬 Smart Insights"
         """, unsafe_allow_html=True)
     
     with col2:
-        high_value_count = len(filtered[filtered["value_score"] > filtered["value_score"].quantile(0.75)])
+        high_value_count = borough_index.count_above(
+            borough, "value_score", borough_index.quantile(borough, "value_score", 0.75)
+        )
         st.markdown(f"""
         <div class="metric-card">
         <h3 style="font-size: 1.8em; margin: 0;">🌟</h3>
@@ -804,29 +951,74 @@ else:  # page == "💬 Smart Insights"
     st.markdown("<div class='section-divider'></div>", unsafe_allow_html=True)
     st.subheader("📥 Export Analysis Data")
     
+    export_format = st.selectbox(
+        "Export format", available_formats(),
+        format_func=lambda fmt: EXPORT_LABELS[fmt]
+    )
+    extension, mime = EXPORT_FORMATS[export_format]
+    
+    # Exports are only built when a button is clicked, then served from the
+    # on-disk cache for this borough filter and dataset version
+    def export_data(kind, build, index=False):
+        return lambda: read_file(materialize_export(build, kind, borough, fingerprint, export_format, index))
+    
+    def summarize_boroughs():
+        if ENGINE == "pandas":
+            return borough_summary(filtered)
+        return artifacts["engine"].borough_summary(filtered)
+    
     col1, col2, col3 = st.columns(3)
     
     with col1:
-        csv = filtered.sort_values("value_score", ascending=False).to_csv(index=False)
         st.download_button(
-            label="📊 Download Rankings (CSV)",
-            data=csv,
-            file_name="neighbourhood_rankings.csv",
-            mime="text/csv"
+            label=f"📊 Download Rankings ({EXPORT_LABELS[export_format]})",
+            data=export_data("neighbourhood_rankings", lambda: borough_index.sorted(borough, "value_score")),
+            file_name=f"neighbourhood_rankings{extension}",
+            mime=mime
         )
     
     with col2:
-        summary_csv = filtered.groupby("neighbourhood_group").agg({
-            "listings": "sum",
-            "avg_price": "mean",
-            "value_score": "mean"
-        }).to_csv()
         st.download_button(
-            label="📈 Download Summary (CSV)",
-            data=summary_csv,
-            file_name="borough_summary.csv",
-            mime="text/csv"
+            label=f"📈 Download Summary ({EXPORT_LABELS[export_format]})",
+            data=export_data("borough_summary", summarize_boroughs, index=True),
+            file_name=f"borough_summary{extension}",
+            mime=mime
         )
     
     with col3:
         st.markdown("💡 **Tip:** Export data for further analysis in Excel or Python")
+
+# ==================== DIAGNOSTICS ====================
+run.finish()
+st.sidebar.markdown("---")
+if st.sidebar.checkbox("🩺 Diagnostics", value=diagnostics.DIAGNOSTICS_DEFAULT):
+    chart_cache = get_chart_cache()
+    with st.sidebar:
+        st.caption(f"Rerun: {run.duration * 1000:.0f} ms · dataset {fingerprint}")
+        refresher = get_refresher()
+        st.caption(
+            f"Data refreshes: {refresher.refreshes} swapped / {refresher.failures} failed"
+            + (f" · last error: {refresher.last_error}" if refresher.last_error else "")
+        )
+        if run.records:
+            stages = pd.DataFrame(run.records)
+            stages["ms"] = (stages["duration_s"] * 1000).round(1)
+            stages["self ms"] = (stages["self_s"] * 1000).round(1)
+            stages["alloc MB"] = (stages["alloc_bytes"] / 1e6).round(2)
+            st.dataframe(
+                stages[["name", "kind", "cache", "ms", "self ms", "rows", "alloc MB"]],
+                use_container_width=True, hide_index=True
+            )
+        figures = charts.figure_stats.snapshot()
+        st.caption(
+            f"Chart cache: {chart_cache.hits} hits / {chart_cache.misses} misses, "
+            f"{chart_cache.size / 1e6:.1f} MB · live figures: {figures['live_figures']}"
+        )
+        st.download_button(
+            "⬇️ Rerun log (JSON)", json.dumps(run.to_dict(), default=str),
+            file_name="diagnostics.json", mime="application/json"
+        )
+        st.download_button(
+            "⬇️ Prometheus metrics", diagnostics.metrics.prometheus(chart_cache, charts.figure_stats),
+            file_name="metrics.prom", mime="text/plain"
+        )
@@ -0,0 +1,65 @@
+from diagnostics import output_size, stage
+
+
+# Lazy dependency graph of derived tables. Each artifact is a loader taking
+# (key, artifacts); it pulls its inputs through `artifacts`, so an upstream
+# table is only materialised when a downstream loader actually runs (i.e. on
+# a cache miss). Pages declare what they read and get nothing else.
+class ArtifactGraph:
+    def __init__(self):
+        self.loaders = {}
+        self.deps = {}
+
+    def artifact(self, name, deps=()):
+        def register(loader):
+            self.loaders[name] = loader
+            self.deps[name] = tuple(deps)
+            return loader
+        return register
+
+    # Requested artifacts plus everything they depend on, inputs first
+    def closure(self, names):
+        order = []
+
+        def visit(name, path=()):
+            if name in path:
+                raise ValueError(f"Artifact cycle: {' -> '.join(path + (name,))}")
+            if name in order:
+                return
+            if name not in self.loaders:
+                raise KeyError(f"Unknown artifact: {name}")
+            for dep in self.deps[name]:
+                visit(dep, path + (name,))
+            order.append(name)
+
+        for name in names:
+            visit(name)
+        return order
+
+    def bind(self, key, names):
+        return LazyArtifacts(self, key, names)
+
+
+class LazyArtifacts:
+    def __init__(self, graph, key, names):
+        self.graph = graph
+        self.key = key
+        self.declared = set(names)
+        self.allowed = set(graph.closure(names))
+        self.materialised = []
+        self._values = {}
+
+    def __getitem__(self, name):
+        if name not in self.allowed:
+            raise KeyError(f"Artifact {name!r} was not declared for this view")
+        if name not in self._values:
+            with stage(name, "artifact") as record:
+                value = self.graph.loaders[name](self.key, self)
+                record["rows"] = len(value) if hasattr(value, "__len__") else None
+                record["output_bytes"] = output_size(value)
+            self._values[name] = value
+            self.materialised.append(name)
+        return self._values[name]
+
+    def __contains__(self, name):
+        return name in self.allowed
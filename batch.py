@@ -0,0 +1,115 @@
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import pandas as pd
+
+from pipeline import add_value_scores, aggregate_neighbourhoods
+from snapshot import read_typed_csv
+
+PARTITION_KEY = "dataset"
+GENERIC_NAMES = {"listings", "ab_nyc_2019", "data"}
+
+
+# Partition label for a listings file, e.g. new-york-city/2023-09-05/listings.csv
+# -> "new-york-city_2023-09-05"; a distinctive file name is used as-is
+def dataset_label(path):
+    parts = os.path.normpath(os.path.abspath(path)).split(os.sep)
+    stem = re.sub(r"(\.csv)?(\.gz)?$", "", parts[-1])
+    if stem.lower() not in GENERIC_NAMES:
+        return stem
+    return "_".join(p for p in parts[-3:-1] if p) or stem
+
+
+def partition_dir(out_dir, label):
+    return os.path.join(out_dir, f"{PARTITION_KEY}={label}")
+
+
+# Load, clean, aggregate and score one file inside a worker process, writing
+# its neighbourhood table straight into the result store
+def process_file(path, out_dir, approx=False):
+    label = dataset_label(path)
+    timings = {}
+
+    # Each file is read once, so parse it directly rather than leave a
+    # snapshot next to it (archives may be read-only)
+    start = time.perf_counter()
+    df = read_typed_csv(path)
+    timings["load"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    neigh_df = aggregate_neighbourhoods(df, approx)
+    timings["aggregate"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    neigh_df = add_value_scores(neigh_df, approx)
+    timings["score"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    target = partition_dir(out_dir, label)
+    os.makedirs(target, exist_ok=True)
+    for col in ["neighbourhood_group", "neighbourhood"]:
+        neigh_df[col] = neigh_df[col].astype(str)
+    neigh_df.to_parquet(os.path.join(target, "part-0.parquet"), index=False)
+    timings["write"] = time.perf_counter() - start
+
+    return {
+        "path": path,
+        "dataset": label,
+        "listings": len(df),
+        "neighbourhoods": len(neigh_df),
+        **{f"{stage}_s": round(seconds, 4) for stage, seconds in timings.items()},
+        "total_s": round(sum(timings.values()), 4),
+    }
+
+
+# Run every file through the pipeline on a process pool; returns per-file timings
+def run_batch(paths, out_dir, workers=None, approx=False, progress=print):
+    os.makedirs(out_dir, exist_ok=True)
+    labels = [dataset_label(path) for path in paths]
+    if len(set(labels)) != len(labels):
+        raise ValueError("Input files map to duplicate dataset labels; rename or nest them by city/date")
+
+    results = []
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(process_file, path, out_dir, approx): path for path in paths}
+        for done, future in enumerate(as_completed(futures), 1):
+            path = futures[future]
+            try:
+                result = future.result()
+            except Exception as exc:
+                result = {"path": path, "dataset": dataset_label(path), "error": repr(exc)}
+                progress(f"[{done}/{len(paths)}] {result['dataset']}: FAILED {exc}")
+            else:
+                progress(
+                    f"[{done}/{len(paths)}] {result['dataset']}: {result['listings']:,} listings in "
+                    f"{result['total_s']:.2f}s (load {result['load_s']:.2f}s, aggregate "
+                    f"{result['aggregate_s']:.2f}s, score {result['score_s']:.3f}s)"
+                )
+            results.append(result)
+
+    timings = pd.DataFrame(results)
+    timings.to_csv(os.path.join(out_dir, "_timings.csv"), index=False)
+    progress(f"Processed {len(paths)} files in {time.perf_counter() - start:.2f}s")
+    return timings
+
+
+# Combined neighbourhood table across every dataset in the store
+def load_results(out_dir, datasets=None):
+    filters = [(PARTITION_KEY, "in", list(datasets))] if datasets else None
+    return pd.read_parquet(out_dir, filters=filters)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Score many Inside Airbnb listing files in parallel")
+    parser.add_argument("paths", nargs="+", help="listings CSV files (one per city/snapshot)")
+    parser.add_argument("--out", default="results", help="partitioned result store directory")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: all cores)")
+    parser.add_argument("--approx", action="store_true", help="use sketch-based distinct counts and percentiles")
+    args = parser.parse_args()
+
+    run_batch(args.paths, args.out, args.workers, args.approx)
@@ -0,0 +1,72 @@
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+from api import ApiServer, ApiState
+from benchmarks.synthetic import write_listings
+
+TARGETS = [
+    "/rankings?borough=Manhattan&limit=50",
+    "/top?borough=Brooklyn&metric=value_score&k=10",
+    "/top?metric=avg_price&k=5&order=asc",
+    "/neighbourhood?name=Queens%201",
+    "/score?availability=180&reviews_per_listing=5&price=120",
+]
+
+
+async def client(host, port, requests, etag_every, latencies, statuses):
+    reader, writer = await asyncio.open_connection(host, port)
+    etag = None
+    for i in range(requests):
+        target = TARGETS[i % len(TARGETS)]
+        conditional = f"If-None-Match: {etag}\r\n" if etag and etag_every and i % etag_every == 0 else ""
+        start = time.perf_counter()
+        writer.write(f"GET {target} HTTP/1.1\r\nHost: {host}\r\n{conditional}\r\n".encode())
+        head = (await reader.readuntil(b"\r\n\r\n")).decode("latin-1")
+        headers = dict(line.split(": ", 1) for line in head.split("\r\n")[1:] if ": " in line)
+        await reader.readexactly(int(headers["Content-Length"]))
+        latencies.append(time.perf_counter() - start)
+        status = int(head.split(" ", 2)[1])
+        statuses[status] = statuses.get(status, 0) + 1
+        etag = headers.get("ETag", etag)
+    writer.close()
+
+
+# Requests/s and latency of the API against a synthetic dataset, using
+# keep-alive connections from concurrent clients in the same process
+async def run(n_rows, clients, requests, etag_every, port):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = write_listings(os.path.join(tmp, "AB_NYC_2019.csv"), n_rows)
+        start = time.perf_counter()
+        api = ApiServer(ApiState(path))
+        load = time.perf_counter() - start
+        server = await asyncio.start_server(api.handle, "127.0.0.1", port)
+        port = server.sockets[0].getsockname()[1]
+
+        latencies, statuses = [], {}
+        start = time.perf_counter()
+        async with server:
+            await asyncio.gather(*(
+                client("127.0.0.1", port, requests, etag_every, latencies, statuses) for _ in range(clients)
+            ))
+        elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    print(f"rows={n_rows:,} clients={clients} requests/client={requests} (tables built in {load:.2f}s)")
+    print(f"  throughput: {len(latencies) / elapsed:10.0f} req/s")
+    print(f"  latency p50: {latencies[len(latencies) // 2] * 1000:7.3f} ms  "
+          f"p99: {latencies[int(len(latencies) * 0.99)] * 1000:7.3f} ms")
+    print(f"  statuses: {dict(sorted(statuses.items()))}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load-test the local HTTP/JSON API")
+    parser.add_argument("--rows", type=int, default=50_000)
+    parser.add_argument("--clients", type=int, default=50)
+    parser.add_argument("--requests", type=int, default=200, help="requests per client")
+    parser.add_argument("--etag-every", type=int, default=2, help="send If-None-Match on every Nth request (0: never)")
+    parser.add_argument("--port", type=int, default=0)
+    args = parser.parse_args()
+    asyncio.run(run(args.rows, args.clients, args.requests, args.etag_every, args.port))
@@ -0,0 +1,95 @@
+import argparse
+import time
+
+import numpy as np
+
+from benchmarks.bench_suite import dataset
+from engine import available_engines, open_engine
+from pipeline import borough_statistics, borough_summary, build_neigh_df, read_listings
+from snapshot import arrow_path, snapshot_path, write_snapshot
+
+SIZES = [50_000, 1_000_000]
+
+
+def timed(func, repeats):
+    best = np.inf
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return result, best
+
+
+def comparable(df):
+    df = df.reset_index()
+    for col in df.select_dtypes(["category", "object"]).columns:
+        df[col] = df[col].astype(str)
+    return df
+
+
+# First mismatching column, or None when the engine reproduces pandas
+def parity(expected, actual, rtol=1e-9):
+    expected, actual = comparable(expected), comparable(actual)
+    if list(expected.columns) != list(actual.columns) or len(expected) != len(actual):
+        return f"shape {list(actual.columns)} x {len(actual)}"
+    for col in expected.columns:
+        left, right = expected[col].to_numpy(), actual[col].to_numpy()
+        if left.dtype.kind in "if" and right.dtype.kind in "if":
+            same = np.allclose(left.astype(np.float64), right.astype(np.float64), rtol=rtol, atol=0, equal_nan=True)
+        else:
+            same = (left == right).all()
+        if not same:
+            return col
+    return None
+
+
+# Neighbourhood table, borough stats and export summary through each engine,
+# compared against the pandas pipeline on the same pinned snapshot
+def run_size(n_rows, engines, loader, repeats):
+    source = dataset(n_rows)
+    path = arrow_path(source) if loader == "mmap" else snapshot_path(source)
+    write_snapshot(source, path)
+
+    timings = {}
+    listings, timings[("pandas", "load")] = timed(lambda: read_listings(source, mode=loader), 1)
+    expected = {}
+    expected["neigh_df"], timings[("pandas", "neigh_df")] = timed(lambda: build_neigh_df(listings), repeats)
+    expected["borough_stats"], timings[("pandas", "borough_stats")] = timed(lambda: borough_statistics(listings), repeats)
+    expected["borough_summary"], timings[("pandas", "borough_summary")] = timed(
+        lambda: borough_summary(expected["neigh_df"]), repeats
+    )
+
+    mismatches = {}
+    for name in engines:
+        engine, timings[(name, "load")] = timed(lambda: open_engine(name, path, listings), 1)
+        actual = {}
+        actual["neigh_df"], timings[(name, "neigh_df")] = timed(engine.neigh_df, repeats)
+        actual["borough_stats"], timings[(name, "borough_stats")] = timed(engine.borough_stats, repeats)
+        actual["borough_summary"], timings[(name, "borough_summary")] = timed(
+            lambda: engine.borough_summary(expected["neigh_df"]), repeats
+        )
+        for table in actual:
+            mismatch = parity(expected[table], actual[table])
+            if mismatch:
+                mismatches[(name, table)] = mismatch
+
+    print(f"rows={n_rows:,} listings={len(listings):,} neighbourhoods={len(expected['neigh_df'])}")
+    stages = ["load", "neigh_df", "borough_stats", "borough_summary"]
+    print(f"  {'engine':<8}" + "".join(f"{stage:>18}" for stage in stages))
+    for name in ["pandas"] + engines:
+        print(f"  {name:<8}" + "".join(f"{timings[(name, stage)] * 1000:15.2f} ms" for stage in stages))
+    for (name, table), column in mismatches.items():
+        print(f"  MISMATCH {name} {table}: {column}")
+    return not mismatches
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare the pandas and embedded SQL engines for parity and speed")
+    parser.add_argument("--rows", type=int, nargs="+", default=SIZES, help="dataset sizes (default: %(default)s)")
+    parser.add_argument("--engines", nargs="+", choices=available_engines()[1:], default=available_engines()[1:])
+    parser.add_argument("--loader", choices=["snapshot", "mmap"], default="snapshot")
+    parser.add_argument("--repeats", type=int, default=5, help="best-of repeats per stage")
+    args = parser.parse_args()
+
+    ok = all([run_size(n_rows, args.engines, args.loader, args.repeats) for n_rows in args.rows])
+    raise SystemExit(0 if ok else 1)
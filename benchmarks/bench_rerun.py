@@ -0,0 +1,44 @@
+import argparse
+import os
+import tempfile
+import time
+
+import streamlit as st
+
+from benchmarks.synthetic import write_listings
+from pipeline import build_neigh_df, dataset_fingerprint, read_listings
+
+
+# Per-rerun cost of the feature-engineering stage, before and after caching
+def run(n_rows, reruns):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = write_listings(os.path.join(tmp, "AB_NYC_2019.csv"), n_rows)
+        df = read_listings(path)
+
+        @st.cache_data
+        def load_neigh_df(fingerprint):
+            return build_neigh_df(df)
+
+        start = time.perf_counter()
+        for _ in range(reruns):
+            build_neigh_df(df)
+        before = (time.perf_counter() - start) / reruns
+
+        load_neigh_df(dataset_fingerprint(path))
+        start = time.perf_counter()
+        for _ in range(reruns):
+            load_neigh_df(dataset_fingerprint(path))
+        after = (time.perf_counter() - start) / reruns
+
+    print(f"rows={n_rows:,} reruns={reruns}")
+    print(f"  before (module-level groupby): {before * 1000:8.2f} ms/rerun")
+    print(f"  after  (cached by fingerprint): {after * 1000:8.2f} ms/rerun")
+    print(f"  speedup: {before / after:.1f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark per-rerun neighbourhood aggregation latency")
+    parser.add_argument("--rows", type=int, default=50_000)
+    parser.add_argument("--reruns", type=int, default=20)
+    args = parser.parse_args()
+    run(args.rows, args.reruns)
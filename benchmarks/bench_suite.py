@@ -0,0 +1,200 @@
+import argparse
+import json
+import os
+import platform
+import subprocess
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+
+import pandas as pd
+
+import charts
+from benchmarks.synthetic import write_listings
+from diagnostics import current_rss, peak_rss
+from indexes import RankingIndex
+from pipeline import add_value_scores, aggregate_neighbourhoods, rankings_table, read_listings
+from snapshot import arrow_path, snapshot_path
+from stats import summarize_listings
+
+SIZES = [50_000, 1_000_000, 10_000_000]
+DATA_DIR = os.path.join(os.path.dirname(__file__), "data")
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+
+
+# Wall time and peak RSS of one stage; RSS is sampled on a background thread
+# because ru_maxrss only ever reports the whole process's high-water mark
+class Stage:
+    def __init__(self, results, name, interval=0.005):
+        self.results = results
+        self.name = name
+        self.interval = interval
+
+    def _sample(self):
+        while not self._done.wait(self.interval):
+            self.peak = max(self.peak, current_rss())
+
+    def __enter__(self):
+        self.start_rss = self.peak = current_rss()
+        self._done = threading.Event()
+        self._sampler = threading.Thread(target=self._sample, daemon=True)
+        self._sampler.start()
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        wall = time.perf_counter() - self.start
+        self._done.set()
+        self._sampler.join()
+        self.peak = max(self.peak, current_rss())
+        self.results[self.name] = {
+            "wall_s": round(wall, 6),
+            "peak_rss_mb": round(self.peak / 2**20, 1),
+            "rss_delta_mb": round((self.peak - self.start_rss) / 2**20, 1),
+        }
+
+
+def dataset(n_rows, data_dir=DATA_DIR):
+    path = os.path.join(data_dir, f"listings_{n_rows}.csv")
+    if not os.path.exists(path):
+        os.makedirs(data_dir, exist_ok=True)
+        write_listings(f"{path}.tmp", n_rows)
+        os.replace(f"{path}.tmp", path)
+    return path
+
+
+# The dashboard's charts, grouped by the page that renders them
+def page_charts(df, neigh_df, index, summary):
+    borough = index.boroughs[0]
+    borough_stats = df.groupby("neighbourhood_group", observed=True).agg(Listings=("id", "count"))
+
+    def heatmap():
+        data = index.top(borough, "listings", 10)[
+            ["neighbourhood", "avg_price", "avg_availability", "reviews_per_listing", "value_score"]
+        ].set_index("neighbourhood")
+        return charts.metrics_heatmap((data - data.min()) / (data.max() - data.min()), borough)
+
+    return {
+        "summary": [
+            lambda: charts.price_distribution([summary[f"price_{k}"] for k in ["min", "q1", "median", "q3", "max"]]),
+            lambda: charts.borough_pie(borough_stats),
+        ],
+        "rankings": [
+            lambda: charts.score_histogram(index.slice("All")),
+            lambda: charts.top10_barh(index.top("All", "value_score", 10)),
+            lambda: charts.price_value_scatter(index.slice("All")),
+        ],
+        "explorer": [
+            lambda: charts.volume_barh(index.top(borough, "listings", 8), borough),
+            heatmap,
+        ],
+    }
+
+
+# Every stage for one dataset size - run in a fresh process so RSS is not
+# inherited from the previous size
+def run_size(n_rows, loader, repeats, data_dir=DATA_DIR):
+    path = dataset(n_rows, data_dir)
+    for snapshot in (snapshot_path(path), arrow_path(path)):
+        if os.path.exists(snapshot):
+            os.remove(snapshot)
+
+    stages = {}
+    with Stage(stages, "load_data_cold"):
+        df = read_listings(path, mode=loader)
+    del df
+    with Stage(stages, "load_data_warm"):
+        df = read_listings(path, mode=loader)
+    with Stage(stages, "aggregate"):
+        neigh_df = aggregate_neighbourhoods(df)
+    with Stage(stages, "score"):
+        neigh_df = add_value_scores(neigh_df)
+    with Stage(stages, "summary"):
+        summary = summarize_listings(df)
+    with Stage(stages, "ranking_index"):
+        index = RankingIndex(neigh_df)
+    with Stage(stages, "rankings_table"):
+        for _ in range(repeats):
+            rankings_table(neigh_df)
+    with Stage(stages, "top_k"):
+        for _ in range(repeats):
+            for borough in ["All"] + index.boroughs:
+                index.top(borough, "value_score", 10)
+                index.bottom(borough, "value_score", 10)
+    for page, draws in page_charts(df, neigh_df, index, summary).items():
+        with Stage(stages, f"charts_{page}"):
+            for draw in draws:
+                charts.render_figure(draw)
+
+    return {
+        "rows": n_rows,
+        "listings": len(df),
+        "neighbourhoods": len(neigh_df),
+        "stages": stages,
+        "process_peak_rss_mb": round(peak_rss() / 2**20, 1),
+    }
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def print_results(results, baseline=None):
+    previous = {r["rows"]: r["stages"] for r in baseline["results"]} if baseline else {}
+    for result in results:
+        print(f"rows={result['rows']:,} listings={result['listings']:,} neighbourhoods={result['neighbourhoods']} "
+              f"process_peak_rss={result['process_peak_rss_mb']:.0f} MB")
+        for name, stage in result["stages"].items():
+            line = f"  {name:<18} {stage['wall_s'] * 1000:10.2f} ms  peak_rss {stage['peak_rss_mb']:8.1f} MB"
+            before = previous.get(result["rows"], {}).get(name)
+            if before and before["wall_s"]:
+                line += f"  ({stage['wall_s'] / before['wall_s']:.2f}x baseline)"
+            print(line)
+
+
+def run(sizes, loader="snapshot", repeats=100, baseline=None, out_dir=RESULTS_DIR):
+    results = []
+    for n_rows in sizes:
+        with ProcessPoolExecutor(max_workers=1, mp_context=get_context("spawn")) as pool:
+            results.append(pool.submit(run_size, n_rows, loader, repeats).result())
+
+    report = {
+        "revision": git_revision(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "machine": platform.machine(),
+        "loader": loader,
+        "repeats": repeats,
+        "results": results,
+    }
+    os.makedirs(out_dir, exist_ok=True)
+    out_path = os.path.join(out_dir, f"{time.strftime('%Y%m%d-%H%M%S')}-{report['revision']}.json")
+    with open(out_path, "w") as f:
+        json.dump(report, f, indent=2)
+
+    print_results(results, baseline)
+    print(f"Saved {out_path}")
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the load, aggregate, score, rank and render stages")
+    parser.add_argument("--rows", type=int, nargs="+", default=SIZES, help="dataset sizes (default: %(default)s)")
+    parser.add_argument("--loader", choices=["snapshot", "mmap"], default="snapshot")
+    parser.add_argument("--repeats", type=int, default=100, help="iterations of the ranking and top-K stages")
+    parser.add_argument("--baseline", help="earlier results JSON to compare wall times against")
+    parser.add_argument("--out", default=RESULTS_DIR, help="directory for the results JSON")
+    args = parser.parse_args()
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    run(args.rows, args.loader, args.repeats, baseline, args.out)
@@ -0,0 +1,44 @@
+import argparse
+import resource
+
+import charts
+from benchmarks.synthetic import make_listings
+from pipeline import build_neigh_df, clean_listings
+
+
+# Render every dashboard chart repeatedly and report live figure counts and RSS
+def run(iterations, n_rows):
+    df = clean_listings(make_listings(n_rows))
+    neigh_df = build_neigh_df(df)
+    borough = neigh_df["neighbourhood_group"].iloc[0]
+    borough_data = neigh_df[neigh_df["neighbourhood_group"] == borough]
+    borough_stats = df.groupby("neighbourhood_group", observed=True).agg(Listings=("id", "count"))
+    heatmap_data = borough_data.nlargest(10, "listings")[
+        ["neighbourhood", "avg_price", "avg_availability", "reviews_per_listing", "value_score"]
+    ].set_index("neighbourhood")
+    draws = [
+        lambda: charts.price_distribution(df["price"].quantile([0, 0.25, 0.5, 0.75, 1]).tolist()),
+        lambda: charts.borough_pie(borough_stats),
+        lambda: charts.score_histogram(neigh_df),
+        lambda: charts.top10_barh(neigh_df.nlargest(10, "value_score")),
+        lambda: charts.price_value_scatter(neigh_df),
+        lambda: charts.volume_barh(borough_data.nlargest(8, "listings"), borough),
+        lambda: charts.metrics_heatmap((heatmap_data - heatmap_data.min()) / (heatmap_data.max() - heatmap_data.min()), borough),
+    ]
+    for i in range(1, iterations + 1):
+        for draw in draws:
+            charts.render_figure(draw)
+        if i % max(1, iterations // 10) == 0:
+            stats = charts.figure_stats.snapshot()
+            rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+            print(f"iter={i:4d} live={stats['live_figures']} pyplot_open={stats['pyplot_open_figures']} "
+                  f"peak_live={stats['peak_live_figures']} peak_fig_mb={stats['peak_figure_bytes'] / 1e6:.1f} "
+                  f"max_rss_mb={rss_mb:.0f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Soak test the managed figure lifecycle")
+    parser.add_argument("--iterations", type=int, default=50)
+    parser.add_argument("--rows", type=int, default=50_000)
+    args = parser.parse_args()
+    run(args.iterations, args.rows)
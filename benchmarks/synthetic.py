@@ -0,0 +1,51 @@
+import numpy as np
+import pandas as pd
+
+# Synthetic listings matching the AB_NYC_2019.csv schema
+BOROUGHS = {
+    "Manhattan": (40.78, -73.97, 32),
+    "Brooklyn": (40.68, -73.95, 47),
+    "Queens": (40.72, -73.84, 51),
+    "Bronx": (40.85, -73.88, 48),
+    "Staten Island": (40.58, -74.15, 43),
+}
+ROOM_TYPES = ["Entire home/apt", "Private room", "Shared room"]
+
+
+def make_listings(n_rows, seed=0):
+    rng = np.random.default_rng(seed)
+    names = list(BOROUGHS)
+    groups = rng.choice(len(names), size=n_rows, p=[0.44, 0.41, 0.12, 0.02, 0.01])
+    neigh_counts = np.array([BOROUGHS[b][2] for b in names])
+    neigh_ids = (rng.random(n_rows) * neigh_counts[groups]).astype(int)
+    lat0 = np.array([BOROUGHS[b][0] for b in names])[groups]
+    lon0 = np.array([BOROUGHS[b][1] for b in names])[groups]
+    borough = np.array(names)[groups]
+    neighbourhood = np.char.add(np.char.add(borough, " "), neigh_ids.astype(str))
+    return pd.DataFrame({
+        "id": np.arange(2539, 2539 + n_rows),
+        "name": np.char.add("Listing ", np.arange(n_rows).astype(str)),
+        "host_id": rng.integers(2000, 300_000_000, n_rows),
+        "host_name": rng.choice(["John", "Maria", "Alex", "Sonder", "Michael"], n_rows),
+        "neighbourhood_group": borough,
+        "neighbourhood": neighbourhood,
+        "latitude": lat0 + rng.normal(0, 0.02, n_rows),
+        "longitude": lon0 + rng.normal(0, 0.02, n_rows),
+        "room_type": rng.choice(ROOM_TYPES, n_rows, p=[0.52, 0.46, 0.02]),
+        "price": np.round(rng.lognormal(4.7, 0.7, n_rows)).astype(int) * (rng.random(n_rows) > 0.001),
+        "minimum_nights": rng.integers(1, 31, n_rows),
+        "number_of_reviews": rng.poisson(23, n_rows),
+        "last_review": "2019-06-23",
+        "reviews_per_month": np.round(rng.gamma(1.0, 1.4, n_rows), 2),
+        "calculated_host_listings_count": rng.integers(1, 10, n_rows),
+        "availability_365": rng.integers(0, 366, n_rows),
+    })
+
+
+# Written in chunks so multi-million-row files never sit in memory at once
+def write_listings(path, n_rows, seed=0, chunk_rows=1_000_000):
+    for i, start in enumerate(range(0, max(n_rows, 1), chunk_rows)):
+        chunk = make_listings(min(chunk_rows, n_rows - start), seed + i)
+        chunk["id"] += start
+        chunk.to_csv(path, index=False, mode="w" if i == 0 else "a", header=i == 0)
+    return path
@@ -0,0 +1,279 @@
+import io
+import os
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+
+import matplotlib.pyplot as plt
+import numpy as np
+import seaborn as sns
+
+from spatial import EARTH_RADIUS_M
+
+# Rendered chart cache budget and output format ("png" or "svg")
+CHART_CACHE_BYTES = int(float(os.environ.get("NYC_AIRBNB_CHART_CACHE_MB", "64")) * 1024 * 1024)
+CHART_FORMAT = os.environ.get("NYC_AIRBNB_CHART_FORMAT", "png")
+
+# "image" renders charts server-side; "client" sends binned/downsampled data to
+# Vega-Lite in the browser for the charts that support it
+CHART_MODE = os.environ.get("NYC_AIRBNB_CHART_MODE", "image")
+
+# Same savefig defaults st.pyplot uses
+SAVEFIG_OPTIONS = {"bbox_inches": "tight", "dpi": 200}
+
+
+# Figure lifecycle - every chart is created, rendered and closed through here
+class FigureStats:
+    def __init__(self):
+        self.created = 0
+        self.closed = 0
+        self.live_bytes = 0
+        self.peak_live = 0
+        self.peak_bytes = 0
+        self._lock = threading.Lock()
+
+    @property
+    def live(self):
+        return self.created - self.closed
+
+    # RGBA raster size of the figure at the dpi it is saved with
+    @staticmethod
+    def figure_bytes(fig):
+        width, height = fig.get_size_inches() * SAVEFIG_OPTIONS["dpi"]
+        return int(width * height * 4)
+
+    def opened(self, fig):
+        with self._lock:
+            self.created += 1
+            self.live_bytes += self.figure_bytes(fig)
+            self.peak_live = max(self.peak_live, self.live)
+            self.peak_bytes = max(self.peak_bytes, self.live_bytes)
+
+    def released(self, fig):
+        with self._lock:
+            self.closed += 1
+            self.live_bytes -= self.figure_bytes(fig)
+
+    def snapshot(self):
+        return {
+            "live_figures": self.live,
+            "pyplot_open_figures": len(plt.get_fignums()),
+            "created": self.created,
+            "closed": self.closed,
+            "peak_live_figures": self.peak_live,
+            "peak_figure_bytes": self.peak_bytes,
+        }
+
+
+figure_stats = FigureStats()
+
+
+@contextmanager
+def managed_figure(*args, **kwargs):
+    fig, ax = plt.subplots(*args, **kwargs)
+    figure_stats.opened(fig)
+    try:
+        yield fig, ax
+    finally:
+        plt.close(fig)
+        figure_stats.released(fig)
+
+
+def render_figure(draw, fmt=CHART_FORMAT):
+    buf = io.BytesIO()
+    with draw() as (fig, ax):
+        fig.savefig(buf, format=fmt, **SAVEFIG_OPTIONS)
+    return buf.getvalue()
+
+
+# Content-addressed LRU of rendered chart bytes, bounded by total size
+class FigureCache:
+    def __init__(self, max_bytes=CHART_CACHE_BYTES, fmt=CHART_FORMAT):
+        self.max_bytes = max_bytes
+        self.fmt = fmt
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    @property
+    def size(self):
+        return self._size
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        with self._lock:
+            data = self._entries.get(key)
+            if data is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return data
+
+    def put(self, key, data):
+        if len(data) > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._size -= len(self._entries.pop(key))
+            self._entries[key] = data
+            self._size += len(data)
+            while self._size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= len(evicted)
+
+    # key is (chart type, borough filter, data fingerprint); draw is a managed figure
+    # context that is only entered on a miss
+    def get_or_render(self, key, draw):
+        key = tuple(key) + (self.fmt,)
+        data = self.get(key)
+        if data is None:
+            data = render_figure(draw, self.fmt)
+            self.put(key, data)
+        return data
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+
+# ==================== CHARTS ====================
+# Each chart yields a managed (fig, ax) so it is always closed after rendering
+@contextmanager
+def price_distribution(price_data):
+    with managed_figure(figsize=(10, 5)) as (fig, ax):
+        labels = ['Min', 'Q1', 'Median', 'Q3', 'Max']
+        colors = ['#ff6b6b', '#ffa94d', '#51cf66', '#4d96ff', '#667eea']
+        bars = ax.bar(labels, price_data, color=colors, edgecolor='black', linewidth=2)
+        ax.set_ylabel("Price ($)", fontsize=12, fontweight='bold')
+        ax.set_title("Price Distribution", fontsize=14, fontweight='bold')
+        for bar in bars:
+            height = bar.get_height()
+            ax.text(bar.get_x() + bar.get_width()/2., height,
+                   f'${int(height)}', ha='center', va='bottom', fontweight='bold')
+        fig.tight_layout()
+        yield fig, ax
+
+
+@contextmanager
+def borough_pie(borough_stats):
+    with managed_figure(figsize=(8, 5)) as (fig, ax):
+        borough_colors = ['#667eea', '#764ba2', '#f093fb', '#4158d0', '#c471ed']
+        ax.pie(borough_stats['Listings'], labels=borough_stats.index, autopct='%1.1f%%',
+              colors=borough_colors, explode=[0.05]*len(borough_stats), startangle=90)
+        ax.set_title("Listings Distribution", fontsize=12, fontweight='bold')
+        yield fig, ax
+
+
+@contextmanager
+def score_histogram(filtered):
+    with managed_figure(figsize=(7, 5)) as (fig, ax):
+        ax.hist(filtered["value_score"], bins=20, color='#667eea', edgecolor='black', linewidth=1.5, alpha=0.7)
+        ax.set_xlabel("Value Score", fontweight='bold')
+        ax.set_ylabel("Count", fontweight='bold')
+        ax.set_title("Distribution", fontweight='bold')
+        ax.grid(axis='y', alpha=0.3)
+        yield fig, ax
+
+
+@contextmanager
+def top10_barh(top10):
+    with managed_figure(figsize=(10, 7)) as (fig, ax):
+        y_pos = np.arange(len(top10))
+        colors_gradient = plt.cm.RdYlGn(np.linspace(0.3, 0.9, len(top10)))
+        bars = ax.barh(y_pos, top10["value_score"].values, color=colors_gradient, edgecolor='black', linewidth=1.5)
+        ax.set_yticks(y_pos)
+        ax.set_yticklabels(top10["neighbourhood"].values, fontweight='bold')
+        ax.set_xlabel("Value Score", fontweight='bold', fontsize=12)
+        ax.set_title("🏆 Top 10 Undervalued Neighbourhoods", fontweight='bold', fontsize=14)
+        ax.invert_yaxis()
+
+        # Add value labels
+        for i, bar in enumerate(bars):
+            width = bar.get_width()
+            ax.text(width + 0.1, bar.get_y() + bar.get_height()/2,
+                   f'{width:.2f}', ha='left', va='center', fontweight='bold')
+
+        ax.grid(axis='x', alpha=0.3)
+        yield fig, ax
+
+
+@contextmanager
+def price_value_scatter(filtered):
+    with managed_figure(figsize=(14, 7)) as (fig, ax):
+        scatter = ax.scatter(
+            filtered["avg_price"],
+            filtered["value_score"],
+            s=filtered["listings"]*3,
+            c=filtered["reviews_per_listing"],
+            cmap='RdYlGn',
+            alpha=0.6,
+            edgecolors='black',
+            linewidth=1.5
+        )
+        ax.set_xlabel("Average Price ($)", fontweight='bold', fontsize=12)
+        ax.set_ylabel("Value Score", fontweight='bold', fontsize=12)
+        ax.set_title("Price vs Value Score (Bubble size = Listings, Color = Reviews/Listing)",
+                    fontweight='bold', fontsize=14)
+        ax.grid(True, alpha=0.3)
+        cbar = fig.colorbar(scatter, ax=ax)
+        cbar.set_label("Reviews per Listing", fontweight='bold')
+        yield fig, ax
+
+
+@contextmanager
+def volume_barh(top_by_listings, borough):
+    with managed_figure(figsize=(10, 6)) as (fig, ax):
+        colors = plt.cm.Spectral(np.linspace(0, 1, len(top_by_listings)))
+        bars = ax.barh(top_by_listings["neighbourhood"], top_by_listings["avg_price"],
+                      color=colors, edgecolor='black', linewidth=1.5)
+        ax.set_xlabel("Average Price ($)", fontweight='bold')
+        ax.set_title(f"{borough} - Top 8 by Volume", fontweight='bold', fontsize=12)
+
+        for bar in bars:
+            width = bar.get_width()
+            ax.text(width + 5, bar.get_y() + bar.get_height()/2,
+                   f'${int(width)}', ha='left', va='center', fontweight='bold')
+        yield fig, ax
+
+
+@contextmanager
+def metrics_heatmap(heatmap_normalized, borough):
+    with managed_figure(figsize=(12, 7)) as (fig, ax):
+        sns.heatmap(heatmap_normalized.T, annot=True, fmt='.2f', cmap='RdYlGn',
+                    cbar_kws={'label': 'Normalized Value (0-1)'}, ax=ax,
+                    linewidths=2, linecolor='white', cbar=True)
+        ax.set_title(f"📊 Metrics Heatmap - {borough} Top Neighbourhoods",
+                    fontweight='bold', fontsize=14)
+        ax.set_ylabel("Metrics", fontweight='bold')
+        yield fig, ax
+
+
+@contextmanager
+def grid_heatmap(cells, borough, cell_metres):
+    with managed_figure(figsize=(12, 8)) as (fig, ax):
+        gx = cells["gx"] - cells["gx"].min()
+        gy = cells["gy"] - cells["gy"].min()
+        grid = np.full((gy.max() + 1, gx.max() + 1), np.nan)
+        grid[gy, gx] = cells["value_score"]
+
+        # Cell size in degrees, so the axes read as longitude/latitude
+        lat0 = cells["latitude"].mean()
+        dlat = np.degrees(cell_metres / EARTH_RADIUS_M)
+        dlon = dlat / np.cos(np.radians(lat0))
+        extent = [cells["longitude"].min() - dlon / 2, cells["longitude"].max() + dlon / 2,
+                  cells["latitude"].min() - dlat / 2, cells["latitude"].max() + dlat / 2]
+        image = ax.imshow(grid, origin="lower", extent=extent, cmap="RdYlGn", interpolation="nearest",
+                          vmax=np.nanpercentile(grid, 95))
+        ax.set_aspect(1 / np.cos(np.radians(lat0)))
+        ax.set_xlabel("Longitude", fontweight='bold')
+        ax.set_ylabel("Latitude", fontweight='bold')
+        ax.set_title(f"📊 Value Score by {cell_metres:,} m Grid Cell - {borough}", fontweight='bold', fontsize=14)
+        cbar = fig.colorbar(image, ax=ax)
+        cbar.set_label("Value Score (capped at 95th percentile)", fontweight='bold')
+        yield fig, ax
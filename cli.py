@@ -0,0 +1,73 @@
+import argparse
+import os
+import sys
+import time
+
+from pipeline import APPROX_MODE, DATA_PATH, borough_summary, build_neigh_df, rankings_table, read_listings
+
+FORMATS = ("csv", "parquet")
+
+
+# Write via a temp file so schedulers never pick up a half-written export
+def write_table(df, path, fmt, index):
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    if fmt == "parquet":
+        df.to_parquet(tmp_path, index=index)
+    else:
+        df.to_csv(tmp_path, index=index)
+    os.replace(tmp_path, path)
+    return path
+
+
+def run(data_path=DATA_PATH, out_dir=".", formats=("csv",), borough=None, approx=APPROX_MODE,
+        stream=False, log=print):
+    start = time.perf_counter()
+    if stream:
+        from streaming import stream_neigh_df
+
+        if approx:
+            log("Note: --stream uses exact aggregates; --approx is ignored")
+        neigh_df = stream_neigh_df(data_path)
+    else:
+        neigh_df = build_neigh_df(read_listings(data_path), approx=approx)
+    if borough:
+        neigh_df = neigh_df[neigh_df["neighbourhood_group"] == borough]
+        if neigh_df.empty:
+            raise ValueError(f"No neighbourhoods found for borough {borough!r}")
+
+    os.makedirs(out_dir, exist_ok=True)
+    written = []
+    for fmt in formats:
+        written.append(write_table(rankings_table(neigh_df), os.path.join(out_dir, f"neighbourhood_rankings.{fmt}"), fmt, False))
+        written.append(write_table(borough_summary(neigh_df), os.path.join(out_dir, f"borough_summary.{fmt}"), fmt, True))
+    for path in written:
+        log(f"Wrote {path}")
+    log(f"Scored {len(neigh_df)} neighbourhoods in {time.perf_counter() - start:.2f}s")
+    return written
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Headless NYC Airbnb value-score pipeline")
+    parser.add_argument("data", nargs="?", default=DATA_PATH, help="listings CSV (default: %(default)s)")
+    parser.add_argument("-o", "--out", default=".", help="output directory (default: current directory)")
+    parser.add_argument("-f", "--format", action="append", choices=FORMATS,
+                        help="output format, repeatable (default: csv)")
+    parser.add_argument("-b", "--borough", help="restrict the exports to one borough")
+    parser.add_argument("--approx", action="store_true", default=APPROX_MODE,
+                        help="sketch-based distinct counts and percentiles")
+    parser.add_argument("--stream", action="store_true", help="chunked ingest for files larger than RAM")
+    parser.add_argument("-q", "--quiet", action="store_true", help="only report errors")
+    args = parser.parse_args(argv)
+
+    log = (lambda message: None) if args.quiet else print
+    try:
+        run(args.data, args.out, tuple(dict.fromkeys(args.format or ["csv"])), args.borough,
+            args.approx, args.stream, log)
+    except (OSError, ValueError) as exc:
+        print(f"error: {exc}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,107 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+# Upper bound on points sent to the browser for one scatter
+CLIENT_MAX_POINTS = int(os.environ.get("NYC_AIRBNB_CLIENT_MAX_POINTS", "2000"))
+
+
+# Histogram counts computed here, so the payload is one row per bin
+def binned_counts(values, bins=20):
+    values = np.asarray(values, dtype=np.float64)
+    values = values[np.isfinite(values)]
+    counts, edges = np.histogram(values, bins=bins)
+    return pd.DataFrame({
+        "bin_start": edges[:-1].astype(np.float32),
+        "bin_end": edges[1:].astype(np.float32),
+        "count": counts.astype(np.int32),
+    })
+
+
+# Keep at most max_points rows by laying a grid over (x, y) and keeping the
+# heaviest row per cell; `represents` counts the rows each survivor stands for
+def thin_points(df, x, y, weight, max_points=CLIENT_MAX_POINTS):
+    df = df[np.isfinite(df[x]) & np.isfinite(df[y])]
+    if len(df) <= max_points:
+        return df.assign(represents=np.int32(1))
+    side = max(1, int(np.sqrt(max_points)))
+    cells = (
+        pd.cut(df[x], side, labels=False).astype(np.int64) * side +
+        pd.cut(df[y], side, labels=False).astype(np.int64)
+    )
+    order = df.assign(_cell=cells.to_numpy()).sort_values(weight, ascending=False, kind="stable")
+    kept = order.drop_duplicates("_cell")
+    represents = order.groupby("_cell").size()
+    return kept.assign(represents=represents.loc[kept["_cell"]].to_numpy().astype(np.int32)).drop(columns="_cell")
+
+
+def compact(df, columns):
+    out = df[columns].copy()
+    for col in out.select_dtypes("float64").columns:
+        out[col] = out[col].astype(np.float32)
+    for col in out.select_dtypes(["object", "category"]).columns:
+        out[col] = out[col].astype(str)
+    return out.reset_index(drop=True)
+
+
+# ==================== CLIENT-SIDE CHARTS ====================
+# Each chart returns (data, Vega-Lite spec) for st.vega_lite_chart; hovering,
+# zooming and borough highlighting then run in the browser
+def score_histogram(filtered, bins=20):
+    data = binned_counts(filtered["value_score"], bins)
+    spec = {
+        "title": "Distribution",
+        "mark": {"type": "bar", "color": "#667eea", "opacity": 0.7, "stroke": "black", "strokeWidth": 1},
+        "encoding": {
+            "x": {"field": "bin_start", "type": "quantitative", "title": "Value Score", "bin": {"binned": True}},
+            "x2": {"field": "bin_end"},
+            "y": {"field": "count", "type": "quantitative", "title": "Count"},
+            "tooltip": [
+                {"field": "bin_start", "title": "From", "format": ".2f"},
+                {"field": "bin_end", "title": "To", "format": ".2f"},
+                {"field": "count", "title": "Neighbourhoods"},
+            ],
+        },
+    }
+    return data, spec
+
+
+def price_value_scatter(filtered, max_points=CLIENT_MAX_POINTS):
+    points = thin_points(filtered, "avg_price", "value_score", "listings", max_points)
+    data = compact(points, [
+        "neighbourhood_group", "neighbourhood", "avg_price", "value_score",
+        "listings", "reviews_per_listing", "represents",
+    ])
+    boroughs = sorted(data["neighbourhood_group"].unique())
+    spec = {
+        "title": "Price vs Value Score (Bubble size = Listings, Color = Reviews/Listing)",
+        "params": [
+            {"name": "zoom", "select": "interval", "bind": "scales"},
+            {
+                "name": "pick",
+                "select": {"type": "point", "fields": ["neighbourhood_group"]},
+                "bind": {"input": "select", "options": [None] + boroughs, "labels": ["All"] + boroughs,
+                         "name": "Highlight borough "},
+            },
+        ],
+        "mark": {"type": "circle", "stroke": "black", "strokeWidth": 1},
+        "encoding": {
+            "x": {"field": "avg_price", "type": "quantitative", "title": "Average Price ($)"},
+            "y": {"field": "value_score", "type": "quantitative", "title": "Value Score"},
+            "size": {"field": "listings", "type": "quantitative", "title": "Listings"},
+            "color": {"field": "reviews_per_listing", "type": "quantitative", "title": "Reviews per Listing",
+                      "scale": {"scheme": "redyellowgreen"}},
+            "opacity": {"condition": {"param": "pick", "value": 0.75}, "value": 0.1},
+            "tooltip": [
+                {"field": "neighbourhood", "title": "Neighbourhood"},
+                {"field": "neighbourhood_group", "title": "Borough"},
+                {"field": "avg_price", "title": "Avg Price ($)", "format": ".0f"},
+                {"field": "value_score", "title": "Value Score", "format": ".2f"},
+                {"field": "listings", "title": "Listings"},
+                {"field": "reviews_per_listing", "title": "Reviews/Listing", "format": ".1f"},
+                {"field": "represents", "title": "Neighbourhoods in cell"},
+            ],
+        },
+    }
+    return data, spec
@@ -0,0 +1,114 @@
+import numpy as np
+import pandas as pd
+
+from scoring import score_batch
+
+DIMENSIONS = ["neighbourhood_group", "neighbourhood", "room_type", "price_band"]
+PRICE_BANDS = [0, 50, 100, 150, 250, 500, np.inf]
+SUMS = {
+    "price_sum": ("price", "sum"),
+    "availability_sum": ("availability_365", "sum"),
+    "total_reviews": ("number_of_reviews", "sum"),
+    "minimum_nights_sum": ("minimum_nights", "sum"),
+    "listings": ("id", "count"),
+}
+EXTREMES = {"min_price": ("price", "min"), "max_price": ("price", "max")}
+# Same column order as pipeline.build_neigh_df
+MEASURES = [
+    "avg_price", "min_price", "max_price", "avg_availability", "total_reviews", "listings",
+    "room_type_diversity", "avg_minimum_nights", "reviews_per_listing", "value_score", "value_percentile",
+]
+
+
+def price_band_labels(bands=PRICE_BANDS):
+    return [f"${lo:.0f}+" if np.isinf(hi) else f"${lo:.0f}-{hi:.0f}" for lo, hi in zip(bands[:-1], bands[1:])]
+
+
+# Lower bound of a price band label, so bands sort by price rather than text
+def band_start(label):
+    return float(label.lstrip("$").split("-")[0].rstrip("+"))
+
+
+# Borough x neighbourhood x room type x price band cells holding sums, counts
+# and price extremes - all mergeable, so any roll-up or drill-down is a
+# groupby over the (small) cell table instead of a rescan of the listings.
+# Scores use the neighbourhood table's popularity scale (its maximum reviews
+# per listing), which slices keep, so they compare with neigh_df's.
+class AggregateCube:
+    def __init__(self, cells, max_reviews_per_listing=None):
+        self.cells = cells
+        if max_reviews_per_listing is None:
+            totals = cells.groupby(DIMENSIONS[:2], observed=True)[["total_reviews", "listings"]].sum()
+            max_reviews_per_listing = (totals["total_reviews"] / totals["listings"]).max()
+        self.max_reviews_per_listing = max_reviews_per_listing
+
+    @classmethod
+    def from_listings(cls, df, price_bands=PRICE_BANDS, max_reviews_per_listing=None):
+        labels = price_band_labels(price_bands)
+        band = pd.cut(df["price"], price_bands, labels=labels, right=False)
+        keys = [df[dim] for dim in DIMENSIONS[:-1]] + [band.rename("price_band")]
+        cells = df.groupby(keys, observed=True).agg(**SUMS, **EXTREMES)
+        return cls(cells.reset_index(), max_reviews_per_listing)
+
+    def __len__(self):
+        return len(self.cells)
+
+    @property
+    def total_listings(self):
+        return int(self.cells["listings"].sum())
+
+    def values(self, dim):
+        return sorted(self.cells[dim].astype(str).unique(), key=band_start if dim == "price_band" else None)
+
+    # Combine cubes built over other partitions (chunks, files, processes)
+    def merge(self, other):
+        cells = pd.concat([self.cells, other.cells], ignore_index=True)
+        for dim in DIMENSIONS:
+            cells[dim] = cells[dim].astype(str)
+        aggs = {col: "sum" for col in SUMS} | {"min_price": "min", "max_price": "max"}
+        return AggregateCube(cells.groupby(DIMENSIONS, observed=True).agg(aggs).reset_index())
+
+    def slice(self, **filters):
+        cells = self.cells
+        for dim, value in filters.items():
+            if value is None or value == "All":
+                continue
+            values = [value] if isinstance(value, str) else list(value)
+            cells = cells[cells[dim].isin(values)]
+        return AggregateCube(cells, self.max_reviews_per_listing)
+
+    # Aggregate the cube to `dims` (any subset, in any order) and score each
+    # group like a neighbourhood. Rolled up to borough x neighbourhood it
+    # reproduces pipeline.build_neigh_df.
+    def rollup(self, dims, **filters):
+        cells = self.slice(**filters).cells
+        dims = list(dims)
+        if dims:
+            grouped = cells.groupby(dims, observed=True)
+            table = grouped.agg(**{col: (col, "sum") for col in SUMS}, min_price=("min_price", "min"),
+                                max_price=("max_price", "max"))
+            if "room_type" not in dims:
+                table["room_type_diversity"] = (
+                    cells[cells["listings"] > 0].groupby(dims, observed=True)["room_type"].nunique()
+                )
+            table = table.reset_index()
+        else:
+            table = pd.DataFrame({col: [cells[col].sum()] for col in SUMS})
+            table["min_price"], table["max_price"] = cells["min_price"].min(), cells["max_price"].max()
+            table["room_type_diversity"] = cells["room_type"].nunique()
+
+        listings = table["listings"]
+        table["avg_price"] = table.pop("price_sum") / listings
+        table["avg_availability"] = table.pop("availability_sum") / listings
+        table["avg_minimum_nights"] = table.pop("minimum_nights_sum") / listings
+        table["reviews_per_listing"] = (table["total_reviews"] / listings).fillna(0)
+        table["value_score"], table["value_percentile"] = score_batch(
+            table["avg_availability"], table["reviews_per_listing"], table["avg_price"],
+            self.max_reviews_per_listing
+        )
+        return table[dims + [col for col in MEASURES if col in table]]
+
+    # One level further down than `dims`, following the hierarchy
+    def drill_down(self, dims, **filters):
+        below = [dim for dim in DIMENSIONS if dim not in dims]
+        return self.rollup(list(dims) + below[:1], **filters)
@@ -0,0 +1,219 @@
+import json
+import logging
+import os
+import platform
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+try:
+    import resource
+except ImportError:  # Windows - no rusage, peak RSS reads as 0
+    resource = None
+
+# Show the sidebar Diagnostics section by default, append every rerun to a
+# JSON-lines log, and measure allocations with tracemalloc (slow) instead of RSS
+DIAGNOSTICS_DEFAULT = os.environ.get("NYC_AIRBNB_DIAGNOSTICS") == "1"
+LOG_PATH = os.environ.get("NYC_AIRBNB_DIAGNOSTICS_LOG")
+TRACE_ALLOCATIONS = os.environ.get("NYC_AIRBNB_TRACE_ALLOC") == "1"
+PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+logger = logging.getLogger("nyc_airbnb.diagnostics")
+current_run = ContextVar("diagnostics_run", default=None)
+
+if TRACE_ALLOCATIONS and not tracemalloc.is_tracing():
+    tracemalloc.start()
+
+
+def current_rss():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * PAGE_SIZE
+    except OSError:  # no procfs - fall back to the process high-water mark
+        return peak_rss()
+
+
+def peak_rss():
+    if resource is None:
+        return 0
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return maxrss if platform.system() == "Darwin" else maxrss * 1024
+
+
+def allocated_bytes():
+    return tracemalloc.get_traced_memory()[0] if tracemalloc.is_tracing() else current_rss()
+
+
+def output_size(value):
+    if hasattr(value, "memory_usage"):
+        usage = value.memory_usage(index=True)
+        return int(usage.sum() if hasattr(usage, "sum") else usage)
+    if isinstance(value, (bytes, bytearray)):
+        return len(value)
+    return None
+
+
+# Timeline of one script rerun. Stages nest (a cache miss on neigh_df loads
+# listings inside it), so each record carries its inclusive and self time.
+# cache is "hit" unless the stage's body reports that it actually ran, and
+# None for stages that are not cached at all.
+class RunRecorder:
+    def __init__(self, page=None, version=None):
+        self.page = page
+        self.version = version
+        self.started = time.time()
+        self.records = []
+        self.duration = None
+        self._open = []
+
+    def start(self):
+        current_run.set(self)
+        self._start = time.perf_counter()
+        return self
+
+    def finish(self):
+        self.duration = time.perf_counter() - self._start
+        current_run.set(None)
+        metrics.observe(self)
+        log_run(self)
+        return self
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.finish()
+
+    @contextmanager
+    def stage(self, name, kind="stage", cached=True):
+        record = {"name": name, "kind": kind, "cache": "hit" if cached else None, "rows": None, "output_bytes": None}
+        self._open.append(record)
+        start_bytes = allocated_bytes()
+        start = time.perf_counter()
+        try:
+            yield record
+        finally:
+            duration = time.perf_counter() - start
+            self._open.pop()
+            record["duration_s"] = duration
+            record["self_s"] = duration - record.pop("_children_s", 0.0)
+            record["alloc_bytes"] = max(0, allocated_bytes() - start_bytes)
+            if self._open:
+                self._open[-1]["_children_s"] = self._open[-1].get("_children_s", 0.0) + duration
+                record["parent"] = self._open[-1]["name"]
+            self.records.append(record)
+
+    def computed(self):
+        if self._open:
+            self._open[-1]["cache"] = "miss"
+
+    def to_dict(self):
+        return {
+            "timestamp": self.started,
+            "page": self.page,
+            "version": self.version,
+            "duration_s": self.duration,
+            "stages": self.records,
+        }
+
+
+class _NullRecord(dict):
+    def __setitem__(self, key, value):
+        pass
+
+
+@contextmanager
+def stage(name, kind="stage", cached=True):
+    run = current_run.get()
+    if run is None:
+        yield _NullRecord()
+        return
+    with run.stage(name, kind, cached) as record:
+        yield record
+
+
+# Put under a cache decorator: the body only runs on a miss, so the
+# enclosing stage is recorded as one
+def computes(func):
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        run = current_run.get()
+        if run is not None:
+            run.computed()
+        return func(*args, **kwargs)
+    return wrapper
+
+
+def log_run(run):
+    line = json.dumps(run.to_dict(), default=str)
+    logger.info(line)
+    if LOG_PATH:
+        with open(LOG_PATH, "a") as f:
+            f.write(line + "\n")
+
+
+# Process-wide counters across every session's reruns, for Prometheus scrapes
+class StageMetrics:
+    def __init__(self):
+        self.reruns = 0
+        self.rerun_seconds = 0.0
+        self.calls = {}
+        self.seconds = {}
+        self.alloc_bytes = {}
+        self.rows = {}
+        self._lock = threading.Lock()
+
+    def observe(self, run):
+        with self._lock:
+            self.reruns += 1
+            self.rerun_seconds += run.duration
+            for record in run.records:
+                key = (record["kind"], record["name"])
+                calls_key = key + (record["cache"] or "none",)
+                self.calls[calls_key] = self.calls.get(calls_key, 0) + 1
+                self.seconds[key] = self.seconds.get(key, 0.0) + record["self_s"]
+                self.alloc_bytes[key] = self.alloc_bytes.get(key, 0) + record["alloc_bytes"]
+                if record["rows"] is not None:
+                    self.rows[key] = record["rows"]
+
+    def prometheus(self, chart_cache=None, figure_stats=None):
+        lines = [
+            "# HELP nyc_airbnb_reruns_total Script reruns observed.",
+            "# TYPE nyc_airbnb_reruns_total counter",
+            f"nyc_airbnb_reruns_total {self.reruns}",
+            "# HELP nyc_airbnb_rerun_seconds_total Wall time spent in reruns.",
+            "# TYPE nyc_airbnb_rerun_seconds_total counter",
+            f"nyc_airbnb_rerun_seconds_total {self.rerun_seconds:.6f}",
+        ]
+        with self._lock:
+            series = [
+                ("stage_calls_total", "counter", "Stage executions by cache outcome.", self.calls, "{}"),
+                ("stage_seconds_total", "counter", "Self time spent in each stage.", self.seconds, "{:.6f}"),
+                ("stage_alloc_bytes_total", "counter", "Bytes allocated by each stage.", self.alloc_bytes, "{}"),
+                ("stage_rows", "gauge", "Rows produced by the last run of each stage.", self.rows, "{}"),
+            ]
+            for metric, kind, help_text, values, fmt in series:
+                lines += [f"# HELP nyc_airbnb_{metric} {help_text}", f"# TYPE nyc_airbnb_{metric} {kind}"]
+                for key, value in sorted(values.items()):
+                    labels = f'kind="{key[0]}",stage="{key[1]}"' + (f',cache="{key[2]}"' if len(key) == 3 else "")
+                    lines.append(f"nyc_airbnb_{metric}{{{labels}}} {fmt.format(value)}")
+        if chart_cache is not None:
+            lines += [
+                "# TYPE nyc_airbnb_chart_cache_hits_total counter",
+                f"nyc_airbnb_chart_cache_hits_total {chart_cache.hits}",
+                "# TYPE nyc_airbnb_chart_cache_misses_total counter",
+                f"nyc_airbnb_chart_cache_misses_total {chart_cache.misses}",
+                "# TYPE nyc_airbnb_chart_cache_bytes gauge",
+                f"nyc_airbnb_chart_cache_bytes {chart_cache.size}",
+            ]
+        if figure_stats is not None:
+            for name, value in figure_stats.snapshot().items():
+                lines += [f"# TYPE nyc_airbnb_figures_{name} gauge", f"nyc_airbnb_figures_{name} {value}"]
+        lines += ["# TYPE nyc_airbnb_process_peak_rss_bytes gauge", f"nyc_airbnb_process_peak_rss_bytes {peak_rss()}"]
+        return "\n".join(lines) + "\n"
+
+
+metrics = StageMetrics()
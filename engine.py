@@ -0,0 +1,204 @@
+import os
+import sqlite3
+import threading
+
+import pandas as pd
+
+from diagnostics import stage
+from pipeline import add_value_scores
+from snapshot import CATEGORICAL_COLUMNS, pa
+
+try:
+    import duckdb
+except ImportError:  # pandas and SQLite engines only
+    duckdb = None
+
+# "pandas" (in-memory frames), "duckdb" (queries the pinned snapshot file
+# directly) or "sqlite" (stdlib fallback loaded from the listings frame)
+ENGINE = os.environ.get("NYC_AIRBNB_ENGINE", "pandas")
+ENGINES = ["pandas", "duckdb", "sqlite"]
+ENGINE_THREADS = int(os.environ.get("NYC_AIRBNB_ENGINE_THREADS", "0"))  # 0 = all cores
+ENGINE_COLUMNS = [
+    "id", "neighbourhood_group", "neighbourhood", "room_type",
+    "price", "minimum_nights", "number_of_reviews", "availability_365",
+]
+
+# Same columns, order and NULL handling as pipeline.aggregate_neighbourhoods
+NEIGHBOURHOODS_SQL = """
+SELECT neighbourhood_group, neighbourhood,
+       AVG(price) AS avg_price,
+       MIN(price) AS min_price,
+       MAX(price) AS max_price,
+       AVG(availability_365) AS avg_availability,
+       SUM(number_of_reviews) AS total_reviews,
+       COUNT(id) AS listings,
+       {distinct} AS room_type_diversity,
+       AVG(minimum_nights) AS avg_minimum_nights
+FROM listings
+WHERE neighbourhood_group IS NOT NULL AND neighbourhood IS NOT NULL
+GROUP BY neighbourhood_group, neighbourhood
+ORDER BY neighbourhood_group, neighbourhood
+"""
+
+BOROUGH_STATS_SQL = """
+SELECT neighbourhood_group,
+       COUNT(id) AS "Listings",
+       AVG(price) AS "Avg Price",
+       MIN(price) AS "Min Price",
+       MAX(price) AS "Max Price",
+       AVG(availability_365) AS "Avg Availability",
+       SUM(number_of_reviews) AS "Total Reviews"
+FROM listings
+WHERE neighbourhood_group IS NOT NULL
+GROUP BY neighbourhood_group
+ORDER BY neighbourhood_group
+"""
+
+BOROUGH_SUMMARY_SQL = """
+SELECT neighbourhood_group,
+       SUM(listings) AS listings,
+       AVG({avg_price}) AS avg_price,
+       AVG({value_score}) AS value_score
+FROM neigh
+WHERE neighbourhood_group IS NOT NULL
+GROUP BY neighbourhood_group
+ORDER BY neighbourhood_group
+"""
+
+
+def available_engines():
+    return [name for name in ENGINES if name != "duckdb" or duckdb is not None]
+
+
+def as_categories(df, columns):
+    for col in columns:
+        df[col] = df[col].astype("category")
+    return df
+
+
+# Shared SQL front end - subclasses provide query/query_frame and how NaN maps
+# to NULL. Results come back shaped like the pandas pipeline's frames.
+class SQLEngine:
+    name = None
+    exact_distinct = "COUNT(DISTINCT room_type)"
+    approx_distinct = exact_distinct
+
+    def nan_to_null(self, column):
+        return column
+
+    def neighbourhoods(self, approx=False):
+        sql = NEIGHBOURHOODS_SQL.format(distinct=self.approx_distinct if approx else self.exact_distinct)
+        return as_categories(self.query(sql), ["neighbourhood_group", "neighbourhood"])
+
+    # Aggregate in the engine, score the (small) result in NumPy
+    def neigh_df(self, approx=False):
+        with stage("aggregate", cached=False) as record:
+            neigh_df = self.neighbourhoods(approx)
+            record["rows"] = len(neigh_df)
+        with stage("score", cached=False) as record:
+            neigh_df = add_value_scores(neigh_df, approx)
+            record["rows"] = len(neigh_df)
+        return neigh_df
+
+    def borough_stats(self):
+        stats = self.query(BOROUGH_STATS_SQL)
+        stats = as_categories(stats, ["neighbourhood_group"]).set_index("neighbourhood_group")
+        return stats.round(2)
+
+    def borough_summary(self, neigh_df):
+        columns = ["neighbourhood_group", "listings", "avg_price", "value_score"]
+        sql = BOROUGH_SUMMARY_SQL.format(
+            avg_price=self.nan_to_null("avg_price"), value_score=self.nan_to_null("value_score")
+        )
+        summary = self.query_frame(sql, "neigh", neigh_df[columns])
+        return as_categories(summary, ["neighbourhood_group"]).set_index("neighbourhood_group")
+
+
+# Vectorized, multi-threaded engine reading the Parquet snapshot in place -
+# only the columns a query touches are decoded
+class DuckDBEngine(SQLEngine):
+    name = "duckdb"
+    approx_distinct = "approx_count_distinct(room_type)"
+
+    def __init__(self, path, threads=ENGINE_THREADS):
+        self.path = path
+        self.table = None
+        self.con = duckdb.connect()
+        if threads:
+            self.con.execute(f"SET threads = {int(threads)}")
+        quoted = path.replace("'", "''")
+        if path.endswith(".parquet"):
+            self.con.execute(f"CREATE VIEW listings AS SELECT * FROM read_parquet('{quoted}')")
+        elif path.endswith(".arrow"):
+            # Scan the memory-mapped Arrow table without copying it; registered
+            # views are per connection, so _cursor registers it on each cursor
+            self.table = pa.ipc.open_file(pa.memory_map(path, "r")).read_all()
+        else:
+            # Raw CSV: apply the snapshot's cleaning in the view
+            columns = ", ".join(ENGINE_COLUMNS)
+            self.con.execute(
+                f"CREATE VIEW listings AS SELECT DISTINCT {columns} "
+                f"FROM read_csv_auto('{quoted}') WHERE price > 0"
+            )
+
+    def nan_to_null(self, column):
+        return f"CASE WHEN isnan({column}) THEN NULL ELSE {column} END"
+
+    # One cursor per query - a DuckDB connection is not shared across threads
+    def _cursor(self):
+        cursor = self.con.cursor()
+        if self.table is not None:
+            cursor.register("listings", self.table)
+        return cursor
+
+    def query(self, sql):
+        return self._cursor().execute(sql).df()
+
+    def query_frame(self, sql, name, df):
+        cursor = self._cursor()
+        cursor.register(name, df)
+        try:
+            return cursor.execute(sql).df()
+        finally:
+            cursor.unregister(name)
+
+
+# Stdlib fallback - single-threaded, and the listings are copied in once
+# (query columns only) since SQLite cannot read the snapshot directly
+class SQLiteEngine(SQLEngine):
+    name = "sqlite"
+
+    def __init__(self, listings):
+        self.con = sqlite3.connect(":memory:", check_same_thread=False)
+        self.lock = threading.Lock()
+        table = listings[ENGINE_COLUMNS].copy()
+        for col in CATEGORICAL_COLUMNS:
+            table[col] = table[col].astype(object).where(table[col].notna(), None)
+        table.to_sql("listings", self.con, index=False, chunksize=100_000)
+
+    def query(self, sql):
+        with self.lock:
+            return pd.read_sql_query(sql, self.con)
+
+    def query_frame(self, sql, name, df):
+        df = df.astype({"neighbourhood_group": object})
+        with self.lock:
+            df.to_sql(name, self.con, index=False, if_exists="replace")
+            try:
+                return pd.read_sql_query(sql, self.con)
+            finally:
+                self.con.execute(f"DROP TABLE {name}")
+
+
+# `path` is the pinned snapshot; `listings` is only read by SQLite. The pandas
+# engine needs no backend.
+def open_engine(name, path=None, listings=None):
+    if name == "pandas":
+        return None
+    if name == "duckdb":
+        if duckdb is None:
+            raise RuntimeError("The duckdb engine needs the duckdb package; install it or pick pandas/sqlite")
+        return DuckDBEngine(path)
+    if name == "sqlite":
+        return SQLiteEngine(listings() if callable(listings) else listings)
+    raise ValueError(f"Unknown engine: {name} (expected one of {', '.join(ENGINES)})")
@@ -0,0 +1,143 @@
+import hashlib
+import io
+import os
+import tempfile
+import zlib
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # CSV exports only
+    pa = pq = None
+
+# Format -> (file extension, MIME type)
+EXPORT_FORMATS = {
+    "csv": (".csv", "text/csv"),
+    "csv.gz": (".csv.gz", "application/gzip"),
+    "parquet": (".parquet", "application/vnd.apache.parquet"),
+    "arrow": (".arrow", "application/vnd.apache.arrow.file"),
+}
+EXPORT_DIR = os.environ.get("NYC_AIRBNB_EXPORT_DIR", os.path.join(tempfile.gettempdir(), "nyc_airbnb_exports"))
+# Exports pile up per dataset version, so the directory is pruned to this size
+EXPORT_MAX_BYTES = int(float(os.environ.get("NYC_AIRBNB_EXPORT_MAX_MB", "512")) * 2**20)
+CHUNK_ROWS = 50_000
+
+
+def available_formats():
+    return [fmt for fmt in EXPORT_FORMATS if pa is not None or fmt.startswith("csv")]
+
+
+# Write-only sink that hands out what has been written so far; tell() keeps
+# counting so Parquet/Arrow footers record the right offsets
+class ChunkSink(io.RawIOBase):
+    def __init__(self):
+        self._chunks = []
+        self._offset = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        data = bytes(data)
+        self._chunks.append(data)
+        self._offset += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._offset
+
+    def drain(self):
+        data, self._chunks = b"".join(self._chunks), []
+        return data
+
+
+def _row_slices(df, chunk_rows):
+    for start in range(0, max(len(df), 1), chunk_rows):
+        yield start, df.iloc[start:start + chunk_rows]
+
+
+def _iter_csv(df, index, chunk_rows):
+    for start, part in _row_slices(df, chunk_rows):
+        yield part.to_csv(index=index, header=start == 0).encode()
+
+
+# Export df as a stream of byte chunks - at most chunk_rows are encoded at once
+def iter_export(df, fmt, index=False, chunk_rows=CHUNK_ROWS):
+    if fmt == "csv":
+        yield from _iter_csv(df, index, chunk_rows)
+    elif fmt == "csv.gz":
+        gzip = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+        for data in _iter_csv(df, index, chunk_rows):
+            yield gzip.compress(data)
+        yield gzip.flush()
+    elif fmt in ("parquet", "arrow"):
+        if pa is None:
+            raise RuntimeError(f"pyarrow is required for {fmt} exports")
+        table = pa.Table.from_pandas(df, preserve_index=index)
+        sink = ChunkSink()
+        if fmt == "parquet":
+            writer = pq.ParquetWriter(sink, table.schema, compression="zstd")
+            write = writer.write_table
+        else:
+            writer = pa.ipc.new_file(sink, table.schema, options=pa.ipc.IpcWriteOptions(compression="zstd"))
+            write = writer.write
+        with writer:
+            for batch in table.to_batches(max_chunksize=chunk_rows):
+                write(pa.Table.from_batches([batch]) if fmt == "parquet" else batch)
+                yield sink.drain()
+        yield sink.drain()
+    else:
+        raise ValueError(f"Unknown export format: {fmt}")
+
+
+def export_path(kind, borough, version, fmt, export_dir=EXPORT_DIR):
+    key = hashlib.sha1(f"{kind}|{borough}|{version}|{fmt}".encode()).hexdigest()[:16]
+    return os.path.join(export_dir, f"{kind}-{key}{EXPORT_FORMATS[fmt][0]}")
+
+
+# Delete least recently used exports until the directory fits in max_bytes;
+# `keep` (the export just served) is never removed
+def prune_exports(export_dir=EXPORT_DIR, max_bytes=EXPORT_MAX_BYTES, keep=None):
+    entries = []
+    for entry in os.scandir(export_dir):
+        if entry.is_file() and not entry.name.endswith(".tmp") and entry.path != keep:
+            stat = entry.stat()
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+    total = sum(size for _, size, _ in entries) + (os.path.getsize(keep) if keep else 0)
+    for _, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        try:
+            os.remove(path)
+            total -= size
+        except OSError:  # removed concurrently, or still open on Windows
+            pass
+
+
+# Disk-backed export cache keyed by table, borough filter, dataset version and
+# format. build() only runs on a miss and the file is swapped in atomically.
+def materialize_export(build, kind, borough, version, fmt, index=False, export_dir=EXPORT_DIR,
+                       max_bytes=EXPORT_MAX_BYTES):
+    path = export_path(kind, borough, version, fmt, export_dir)
+    if os.path.exists(path):
+        os.utime(path)  # recently used
+        return path
+    os.makedirs(export_dir, exist_ok=True)
+    # Unique temp file per call - sessions are threads of one process, so
+    # concurrent clicks on the same export must not share a temp path
+    fd, tmp_path = tempfile.mkstemp(dir=export_dir, prefix=os.path.basename(path) + ".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            for data in iter_export(build(), fmt, index):
+                f.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+    prune_exports(export_dir, max_bytes, keep=path)
+    return path
+
+
+def read_file(path):
+    with open(path, "rb") as f:
+        return f.read()
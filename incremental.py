@@ -0,0 +1,129 @@
+from collections import Counter
+
+import pandas as pd
+
+from pipeline import add_value_scores
+
+KEYS = ["neighbourhood_group", "neighbourhood"]
+SUMS = {
+    "price_sum": ("price", "sum"),
+    "availability_sum": ("availability_365", "sum"),
+    "total_reviews": ("number_of_reviews", "sum"),
+    "minimum_nights_sum": ("minimum_nights", "sum"),
+    "listings": ("id", "count"),
+}
+
+
+# Mergeable per-neighbourhood state - sums and counts, a price histogram for
+# min/max under deletes and room type counts for the distinct count. Applying
+# a batch costs a groupby over the batch plus a merge into the small state.
+class NeighbourhoodAggregator:
+    def __init__(self):
+        self.sums = pd.DataFrame(columns=list(SUMS), dtype="int64")
+        self.sums.index = pd.MultiIndex.from_tuples([], names=KEYS)
+        self.room_types = pd.DataFrame(index=self.sums.index, dtype="int64")
+        self.prices = {}
+        self.min_price = {}
+        self.max_price = {}
+        self.version = 0
+
+    @classmethod
+    def from_listings(cls, df):
+        agg = cls()
+        agg.append(df)
+        return agg
+
+    def __len__(self):
+        return len(self.sums)
+
+    @property
+    def total_listings(self):
+        return int(self.sums["listings"].sum())
+
+    def append(self, batch):
+        self._apply(batch, 1)
+        return self
+
+    # Rows must be the same records that were appended earlier
+    def remove(self, batch):
+        self._apply(batch, -1)
+        return self
+
+    def _apply(self, batch, sign):
+        if batch.empty:
+            return
+        batch = batch.assign(**{key: batch[key].astype(str) for key in KEYS + ["room_type"]})
+        sums = batch.groupby(KEYS).agg(**SUMS).astype("int64")
+        room_types = batch.groupby(KEYS + ["room_type"]).size().unstack(fill_value=0)
+        prices = batch.groupby(KEYS + ["price"]).size()
+
+        self.sums = self.sums.add(sign * sums, fill_value=0).astype("int64")
+        self.room_types = self.room_types.add(sign * room_types, fill_value=0).fillna(0).astype("int64")
+
+        touched = {}
+        for (group, neigh, price), count in prices.items():
+            key = (group, neigh)
+            hist = self.prices.setdefault(key, Counter())
+            hist[price] += sign * count
+            if hist[price] <= 0:
+                del hist[price]
+            low, high = touched.get(key, (price, price))
+            touched[key] = (min(low, price), max(high, price))
+        self._update_extremes(touched, sign)
+
+        empty = self.sums["listings"] <= 0
+        if empty.any():
+            for key in self.sums.index[empty]:
+                self.prices.pop(key, None)
+                self.min_price.pop(key, None)
+                self.max_price.pop(key, None)
+            self.sums = self.sums[~empty]
+            self.room_types = self.room_types.loc[self.sums.index]
+        self.version += 1
+
+    def _update_extremes(self, touched, sign):
+        for key, (batch_low, batch_high) in touched.items():
+            hist = self.prices.get(key)
+            if not hist:
+                continue
+            low, high = self.min_price.get(key), self.max_price.get(key)
+            if sign > 0:
+                # Appends can only widen the range
+                low = batch_low if low is None else min(low, batch_low)
+                high = batch_high if high is None else max(high, batch_high)
+            else:
+                # Deletes only rescan the histogram when an extreme was removed
+                if low not in hist:
+                    low = min(hist)
+                if high not in hist:
+                    high = max(hist)
+            self.min_price[key], self.max_price[key] = low, high
+
+    # Combine state built over another partition (chunk, borough, process)
+    def merge(self, other):
+        self.sums = self.sums.add(other.sums, fill_value=0).astype("int64")
+        self.room_types = self.room_types.add(other.room_types, fill_value=0).fillna(0).astype("int64")
+        for key, hist in other.prices.items():
+            self.prices.setdefault(key, Counter()).update(hist)
+        for key in other.prices:
+            low, high = self.min_price.get(key), self.max_price.get(key)
+            self.min_price[key] = other.min_price[key] if low is None else min(low, other.min_price[key])
+            self.max_price[key] = other.max_price[key] if high is None else max(high, other.max_price[key])
+        self.version += 1
+        return self
+
+    # Same columns as pipeline.build_neigh_df
+    def to_neigh_df(self):
+        sums = self.sums.sort_index()
+        listings = sums["listings"]
+        neigh_df = pd.DataFrame({
+            "avg_price": sums["price_sum"] / listings,
+            "min_price": pd.Series(self.min_price).reindex(sums.index).astype("int64"),
+            "max_price": pd.Series(self.max_price).reindex(sums.index).astype("int64"),
+            "avg_availability": sums["availability_sum"] / listings,
+            "total_reviews": sums["total_reviews"],
+            "listings": listings,
+            "room_type_diversity": (self.room_types.reindex(sums.index) > 0).sum(axis=1).astype("int64"),
+            "avg_minimum_nights": sums["minimum_nights_sum"] / listings,
+        }, index=sums.index).reset_index()
+        return add_value_scores(neigh_df)
@@ -0,0 +1,88 @@
+import numpy as np
+
+SORT_KEYS = ["value_score", "listings", "avg_price"]
+
+
+# Borough -> contiguous row range of the neighbourhood table, plus each
+# borough's rows pre-sorted by the ranking columns. Lookups return slices of
+# the shared table, so callers must treat them as read-only.
+class BoroughIndex:
+    def __init__(self, neigh_df, sort_keys=SORT_KEYS):
+        table = neigh_df.sort_values("neighbourhood_group", kind="stable").reset_index(drop=True)
+        groups = table["neighbourhood_group"].astype(str).to_numpy()
+        starts = np.flatnonzero(np.r_[True, groups[1:] != groups[:-1]])
+        stops = np.r_[starts[1:], len(groups)]
+
+        self.table = table
+        self.boroughs = sorted(groups[starts])
+        self._slices = {"All": slice(0, len(table))}
+        for start, stop in zip(starts, stops):
+            self._slices[groups[start]] = slice(int(start), int(stop))
+
+        self._orders = {}
+        for borough, rows in self._slices.items():
+            part = table.iloc[rows]
+            for col in sort_keys:
+                self._orders[borough, col] = part.sort_values(col, ascending=False, kind="stable")
+
+    def slice(self, borough):
+        return self.table.iloc[self._slices[borough]]
+
+    # Rows ordered by col, highest first (same tie order as nlargest)
+    def sorted(self, borough, col):
+        return self._orders[borough, col]
+
+    def top(self, borough, col, n):
+        return self._orders[borough, col].iloc[:n]
+
+
+RANK_KEYS = SORT_KEYS + ["reviews_per_listing"]
+
+
+# Per-borough, per-metric ascending/descending orderings and sorted value
+# arrays, built once per dataset version. Top/bottom-K, argmax/argmin,
+# quantiles and percentile-of are then slices and binary searches.
+class RankingIndex(BoroughIndex):
+    def __init__(self, neigh_df, rank_keys=RANK_KEYS):
+        super().__init__(neigh_df, rank_keys)
+        self._ascending = {}
+        self._values = {}
+        for borough, rows in self._slices.items():
+            part = self.table.iloc[rows]
+            for col in rank_keys:
+                self._ascending[borough, col] = part.sort_values(col, kind="stable")
+                values = self._ascending[borough, col][col].to_numpy(dtype=float)
+                self._values[borough, col] = values[~np.isnan(values)]
+
+    # Same tie order as nsmallest
+    def bottom(self, borough, col, n):
+        return self._ascending[borough, col].iloc[:n]
+
+    # First row holding the max/min, like .loc[idxmax()] / .loc[idxmin()]
+    def argmax(self, borough, col):
+        return self._orders[borough, col].iloc[0]
+
+    def argmin(self, borough, col):
+        return self._ascending[borough, col].iloc[0]
+
+    # Linear interpolation, matching Series.quantile
+    def quantile(self, borough, col, q):
+        values = self._values[borough, col]
+        pos = q * (len(values) - 1)
+        lo = int(np.floor(pos))
+        hi = min(lo + 1, len(values) - 1)
+        return values[lo] + (values[hi] - values[lo]) * (pos - lo)
+
+    def count_above(self, borough, col, value):
+        values = self._values[borough, col]
+        return len(values) - int(np.searchsorted(values, value, side="right"))
+
+    # Percentile of a new value within the borough - rank(pct=True) * 100 of
+    # the value appended to the borough's values, so it stays within (0, 100]
+    def percentile_of(self, borough, col, value):
+        if np.isnan(value):
+            return np.nan
+        values = self._values[borough, col]
+        below = np.searchsorted(values, value, side="left")
+        equal = np.searchsorted(values, value, side="right") - below
+        return (below + equal / 2 + 1) / (len(values) + 1) * 100
@@ -0,0 +1,103 @@
+import hashlib
+import os
+
+import numpy as np
+
+from diagnostics import stage
+from scoring import score_batch
+from sketches import DISTINCT_ERROR, QUANTILE_ERROR, grouped_distinct
+from snapshot import load_listings, map_listings
+
+DATA_PATH = "AB_NYC_2019.csv"
+
+# "snapshot" (Parquet, per-process copy) or "mmap" (shared Arrow IPC view)
+LOADER_MODE = os.environ.get("NYC_AIRBNB_LOADER", "snapshot")
+
+# Sketch-based quantiles, percentiles and distinct counts for very large inputs
+APPROX_MODE = os.environ.get("NYC_AIRBNB_APPROX", "0") == "1"
+
+
+# Dataset fingerprint - cheap stat-based key so caches follow the source file
+def dataset_fingerprint(path=DATA_PATH):
+    stat = os.stat(path)
+    key = f"{os.path.abspath(path)}:{stat.st_size}:{stat.st_mtime_ns}"
+    return hashlib.sha1(key.encode()).hexdigest()[:16]
+
+
+# Cleaning
+def clean_listings(df):
+    return df[df["price"] > 0].drop_duplicates()
+
+
+# Typed snapshot when available, rebuilt whenever the CSV changes
+def read_listings(path=DATA_PATH, mode=LOADER_MODE):
+    if mode == "mmap":
+        return map_listings(path)
+    return load_listings(path)
+
+
+# Feature Engineering - Enhanced Value Score
+def build_neigh_df(df, approx=False, distinct_error=DISTINCT_ERROR, quantile_error=QUANTILE_ERROR):
+    with stage("aggregate", cached=False) as record:
+        neigh_df = aggregate_neighbourhoods(df, approx, distinct_error)
+        record["rows"] = len(df)
+    with stage("score", cached=False) as record:
+        neigh_df = add_value_scores(neigh_df, approx, quantile_error)
+        record["rows"] = len(neigh_df)
+    return neigh_df
+
+
+def aggregate_neighbourhoods(df, approx=False, distinct_error=DISTINCT_ERROR):
+    grouped = df.groupby(["neighbourhood_group", "neighbourhood"], observed=True)
+    neigh_df = grouped.agg(
+        avg_price=("price", "mean"),
+        min_price=("price", "min"),
+        max_price=("price", "max"),
+        avg_availability=("availability_365", "mean"),
+        total_reviews=("number_of_reviews", "sum"),
+        listings=("id", "count"),
+        **({} if approx else {"room_type_diversity": ("room_type", "nunique")}),
+        avg_minimum_nights=("minimum_nights", "mean")
+    ).reset_index()
+    if approx:
+        # HyperLogLog per neighbourhood instead of an exact nunique
+        diversity = grouped_distinct(grouped.ngroup().to_numpy(), df["room_type"], len(neigh_df), distinct_error)
+        neigh_df.insert(neigh_df.columns.get_loc("listings") + 1, "room_type_diversity", np.rint(diversity).astype("int64"))
+    return neigh_df
+
+
+def add_value_scores(neigh_df, approx=False, quantile_error=QUANTILE_ERROR):
+    neigh_df["reviews_per_listing"] = (
+        neigh_df["total_reviews"] / neigh_df["listings"]
+    ).fillna(0)
+
+    # Enhanced Value Score Formula
+    neigh_df["value_score"], neigh_df["value_percentile"] = score_batch(
+        neigh_df["avg_availability"], neigh_df["reviews_per_listing"], neigh_df["avg_price"],
+        percentile_error=quantile_error if approx else None
+    )
+    return neigh_df
+
+
+# Export tables - the dashboard's download buttons and the CLI share these
+def rankings_table(neigh_df):
+    return neigh_df.sort_values("value_score", ascending=False, kind="stable")
+
+
+def borough_summary(neigh_df):
+    return neigh_df.groupby("neighbourhood_group", observed=True).agg({
+        "listings": "sum",
+        "avg_price": "mean",
+        "value_score": "mean"
+    })
+
+
+def borough_statistics(df):
+    stats = df.groupby("neighbourhood_group", observed=True).agg({
+        "id": "count",
+        "price": ["mean", "min", "max"],
+        "availability_365": "mean",
+        "number_of_reviews": "sum"
+    }).round(2)
+    stats.columns = ["Listings", "Avg Price", "Min Price", "Max Price", "Avg Availability", "Total Reviews"]
+    return stats
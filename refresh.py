@@ -0,0 +1,223 @@
+import logging
+import os
+import shutil
+import threading
+import time
+from collections import namedtuple
+
+from pipeline import LOADER_MODE, dataset_fingerprint
+from snapshot import (
+    SNAPSHOT_COLUMNS, file_sha256, pa, read_snapshot, read_snapshot_metadata, read_typed_csv, source_state,
+    write_snapshot,
+)
+
+# Poll interval, how long a changed file must stay unchanged before it is
+# read, and an optional directory new CSVs are dropped into
+REFRESH_SECONDS = float(os.environ.get("NYC_AIRBNB_REFRESH_SECONDS", "5"))
+SETTLE_SECONDS = float(os.environ.get("NYC_AIRBNB_REFRESH_SETTLE_SECONDS", "2"))
+DROP_DIR = os.environ.get("NYC_AIRBNB_DROP_DIR")
+VERSIONS_KEPT = 3
+
+logger = logging.getLogger("nyc_airbnb.refresh")
+
+Version = namedtuple("Version", ["fingerprint", "path", "data", "built_at", "build_seconds"])
+
+
+def versions_dir(source):
+    return os.path.join(os.path.dirname(os.path.abspath(source)), ".versions")
+
+
+# Immutable typed copy of the source as of `fingerprint`, so loaders for a
+# version never read a file that has since been replaced
+def pin_version(source, fingerprint, mode=LOADER_MODE):
+    directory = versions_dir(source)
+    os.makedirs(directory, exist_ok=True)
+    if pa is None:
+        path = os.path.join(directory, f"{fingerprint}.csv")
+        if not os.path.exists(path):
+            shutil.copyfile(source, f"{path}.tmp")
+            os.replace(f"{path}.tmp", path)
+        return path
+    path = os.path.join(directory, fingerprint + (".arrow" if mode == "mmap" else ".parquet"))
+    if not os.path.exists(path) and not _link_unchanged(source, path):
+        write_snapshot(source, path)
+    return path
+
+
+# A touched but unchanged CSV (same size and SHA-256 as an earlier pinned
+# version) gets a hard link to that snapshot instead of a re-parse
+def _link_unchanged(source, path):
+    size = source_state(source)["size"]
+    digest = None
+    extension = os.path.splitext(path)[1]
+    candidates = [entry for entry in os.scandir(os.path.dirname(path)) if entry.name.endswith(extension)]
+    for entry in sorted(candidates, key=lambda entry: entry.stat().st_mtime, reverse=True):
+        try:
+            meta = read_snapshot_metadata(entry.path)
+        except (OSError, ValueError):  # partial or foreign file
+            continue
+        if meta is None or meta.get("columns") != SNAPSHOT_COLUMNS or meta["size"] != size:
+            continue
+        digest = digest or file_sha256(source)
+        if meta["sha256"] != digest:
+            continue
+        try:
+            os.link(entry.path, path)
+        except OSError:  # no hard links here - a copy still skips the parse
+            shutil.copyfile(entry.path, f"{path}.tmp")
+            os.replace(f"{path}.tmp", path)
+        os.utime(path)
+        return True
+    return False
+
+
+# Keep only the newest `keep` pinned snapshots (by mtime) - versions left
+# behind by earlier processes are otherwise never removed
+def prune_versions(source, keep=VERSIONS_KEPT, protect=()):
+    directory = versions_dir(source)
+    if not os.path.isdir(directory):
+        return
+    entries = sorted(
+        (entry for entry in os.scandir(directory) if entry.is_file()),
+        key=lambda entry: entry.stat().st_mtime, reverse=True,
+    )
+    for entry in entries[keep:]:
+        if entry.path in protect:
+            continue
+        try:
+            os.remove(entry.path)
+        except OSError:  # in use on Windows, or removed concurrently
+            pass
+
+
+def read_version(path):
+    if path.endswith(".csv"):
+        return read_typed_csv(path)
+    return read_snapshot(path)
+
+
+# Watches the source file (and optional drop directory) on a daemon thread.
+# A settled change is pinned to a versioned snapshot, build(version) derives
+# everything from it off the request path, and only then is the new version
+# published with a single reference swap - readers see the old or the new
+# version, never a partial one.
+class DataRefresher:
+    def __init__(self, source, build=None, drop_dir=DROP_DIR, interval=REFRESH_SECONDS,
+                 settle=SETTLE_SECONDS, mode=LOADER_MODE, build_initial=True):
+        self.source = source
+        self.build = build
+        self.drop_dir = drop_dir
+        self.interval = interval
+        self.settle = settle
+        self.mode = mode
+        self.build_initial = build_initial
+        self.refreshes = 0
+        self.failures = 0
+        self.last_error = None
+        self._current = None
+        self._paths = {}
+        self._changed = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    # The published version; the very first call builds it in the caller
+    def current(self):
+        if self._current is None:
+            with self._lock:
+                if self._current is None:
+                    self._publish(self._build(self.build_initial))
+        return self._current
+
+    def path_for(self, fingerprint):
+        return self._paths[fingerprint]
+
+    def start(self):
+        prune_versions(self.source, protect=set(self._paths.values()))
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="nyc-airbnb-refresher", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.poll()
+            except Exception as exc:
+                self.failures += 1
+                self.last_error = repr(exc)
+                logger.exception("Dataset refresh failed")
+
+    # One watch step; returns True when a new version was published
+    def poll(self):
+        self._ingest_drop()
+        try:
+            fingerprint = dataset_fingerprint(self.source)
+        except FileNotFoundError:
+            return False
+        if self._current is not None and fingerprint == self._current.fingerprint:
+            self._changed = None
+            return False
+        # Wait for writers to finish before reading
+        now = time.monotonic()
+        if self._changed is None or self._changed[0] != fingerprint:
+            self._changed = (fingerprint, now)
+        if now - self._changed[1] < self.settle:
+            return False
+        with self._lock:
+            self._publish(self._build(True))
+        self._changed = None
+        return True
+
+    # Move the newest settled CSV from the drop directory over the source;
+    # older drops are superseded rather than applied out of order
+    def _ingest_drop(self):
+        if not self.drop_dir or not os.path.isdir(self.drop_dir):
+            return
+        drops = [entry for entry in os.scandir(self.drop_dir) if entry.is_file() and entry.name.endswith(".csv")]
+        if not drops:
+            return
+        newest = max(drops, key=lambda entry: entry.stat().st_mtime_ns)
+        if time.time() - newest.stat().st_mtime < self.settle:
+            return
+        try:
+            os.replace(newest.path, self.source)
+        except OSError:  # different filesystem
+            tmp_path = f"{self.source}.{os.getpid()}.tmp"
+            shutil.copy2(newest.path, tmp_path)
+            os.replace(tmp_path, self.source)
+            os.remove(newest.path)
+        for entry in drops:
+            if entry.path != newest.path:
+                os.replace(entry.path, f"{entry.path}.superseded")
+        logger.info("Ingested %s from the drop directory", newest.name)
+
+    def _build(self, derive):
+        start = time.perf_counter()
+        before = source_state(self.source)
+        fingerprint = dataset_fingerprint(self.source)
+        path = pin_version(self.source, fingerprint, self.mode)
+        if source_state(self.source) != before:
+            raise RuntimeError(f"{self.source} changed while it was being read; retrying on the next poll")
+        self._paths[fingerprint] = path
+        version = Version(fingerprint, path, None, time.time(), 0.0)
+        data = self.build(version) if derive and self.build is not None else None
+        return version._replace(data=data, build_seconds=time.perf_counter() - start)
+
+    def _publish(self, version):
+        previous = self._current
+        self._current = version
+        if previous is not None:
+            self.refreshes += 1
+            logger.info("Swapped dataset %s -> %s (built in %.2fs)",
+                        previous.fingerprint, version.fingerprint, version.build_seconds)
+        # Keep the last few pinned versions for sessions still reading them
+        for fingerprint in list(self._paths)[:-VERSIONS_KEPT]:
+            path = self._paths.pop(fingerprint)
+            if os.path.exists(path):
+                os.remove(path)
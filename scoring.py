@@ -0,0 +1,72 @@
+import numpy as np
+
+# Value Score = (Availability Ratio × Popularity Score × Price Efficiency) × 100
+DAYS_PER_YEAR = 365
+PRICE_SCALE = 1000
+
+
+def as_array(values):
+    # Accepts NumPy arrays, pandas Series, Arrow arrays/chunked arrays and lists
+    return np.asarray(values, dtype=np.float64)
+
+
+# Popularity is normalised by max_reviews_per_listing - the maximum of the
+# batch itself unless a reference (e.g. the neighbourhood table's) is given
+def value_score(availability, reviews_per_listing, price, max_reviews_per_listing=None):
+    availability, popularity, price_efficiency = value_components(
+        availability, reviews_per_listing, price, max_reviews_per_listing
+    )
+    with np.errstate(invalid="ignore"):
+        return (availability * popularity * price_efficiency) * 100
+
+
+# Availability ratio, review popularity and inverse price weight as separate
+# arrays - value_score is 100 × their product
+def value_components(availability, reviews_per_listing, price, max_reviews_per_listing=None):
+    availability = as_array(availability)
+    reviews_per_listing = as_array(reviews_per_listing)
+    price = as_array(price)
+    if max_reviews_per_listing is None:
+        max_reviews_per_listing = np.nanmax(reviews_per_listing) if reviews_per_listing.size else np.nan
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return (
+            availability / DAYS_PER_YEAR,  # Availability ratio
+            reviews_per_listing / max_reviews_per_listing,  # Review popularity
+            PRICE_SCALE / price,  # Inverse price weight
+        )
+
+
+# Average-rank percentile, matching Series.rank(pct=True) * 100 (NaN stays NaN)
+def value_percentile(scores):
+    scores = as_array(scores)
+    out = np.full(scores.shape, np.nan)
+    valid = ~np.isnan(scores)
+    values = scores[valid]
+    if not values.size:
+        return out
+    order = np.argsort(values, kind="stable")
+    sorted_values = values[order]
+    # Tied values share the mean of their 1-based ranks
+    starts = np.flatnonzero(np.r_[True, sorted_values[1:] != sorted_values[:-1]])
+    counts = np.diff(np.r_[starts, len(sorted_values)])
+    mean_ranks = starts + (counts + 1) / 2
+    ranks = np.empty(len(values))
+    ranks[order] = np.repeat(mean_ranks, counts)
+    out[valid] = ranks / len(values) * 100
+    return out
+
+
+# Sketch-based percentile for very large batches - normalised rank error
+# stays within `error` without sorting the full array
+def approx_value_percentile(scores, error):
+    from sketches import KLLSketch
+
+    scores = as_array(scores)
+    return KLLSketch.from_error(error).update(scores).percentile_of(scores)
+
+
+def score_batch(availability, reviews_per_listing, price, max_reviews_per_listing=None, percentile_error=None):
+    scores = value_score(availability, reviews_per_listing, price, max_reviews_per_listing)
+    if percentile_error is not None:
+        return scores, approx_value_percentile(scores, percentile_error)
+    return scores, value_percentile(scores)
@@ -0,0 +1,167 @@
+import math
+import os
+
+import numpy as np
+import pandas as pd
+
+# Default error bounds for the approximate mode
+QUANTILE_ERROR = float(os.environ.get("NYC_AIRBNB_QUANTILE_ERROR", "0.01"))
+DISTINCT_ERROR = float(os.environ.get("NYC_AIRBNB_DISTINCT_ERROR", "0.02"))
+
+
+# KLL quantile sketch - a stack of compactors whose items at level h carry
+# weight 2**h. Normalised rank error is about 2.3 / k**0.97 (99% confidence)
+# and two sketches merge by concatenating levels and compacting again.
+class KLLSketch:
+    def __init__(self, k=200, seed=None):
+        self.k = k
+        self.n = 0
+        self.min = np.inf
+        self.max = -np.inf
+        self.levels = [np.empty(0)]
+        self._rng = np.random.default_rng(seed)
+
+    @classmethod
+    def from_error(cls, error=QUANTILE_ERROR, seed=None):
+        return cls(max(8, math.ceil((2.296 / error) ** (1 / 0.9723))), seed)
+
+    @property
+    def error(self):
+        return 2.296 / self.k ** 0.9723
+
+    def __len__(self):
+        return sum(len(items) for items in self.levels)
+
+    def _capacity(self, level):
+        depth = len(self.levels) - level - 1
+        return max(2, math.ceil(self.k * (2 / 3) ** depth))
+
+    def update(self, values):
+        values = np.asarray(values, dtype=np.float64)
+        values = values[~np.isnan(values)]
+        if len(values):
+            self.n += len(values)
+            self.min = min(self.min, values.min())
+            self.max = max(self.max, values.max())
+            self.levels[0] = np.concatenate([self.levels[0], values])
+        self._compress()
+        return self
+
+    def merge(self, other):
+        for level, items in enumerate(other.levels):
+            if level == len(self.levels):
+                self.levels.append(np.empty(0))
+            self.levels[level] = np.concatenate([self.levels[level], items])
+        self.n += other.n
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self._compress()
+        return self
+
+    # Halve every over-full level, promoting a random half of its sorted items
+    def _compress(self):
+        level = 0
+        while level < len(self.levels):
+            items = self.levels[level]
+            if len(items) > self._capacity(level):
+                if level + 1 == len(self.levels):
+                    self.levels.append(np.empty(0))
+                items = np.sort(items)
+                held = len(items) % 2
+                self.levels[level] = items[:held]
+                promoted = items[held + self._rng.integers(2)::2]
+                self.levels[level + 1] = np.concatenate([self.levels[level + 1], promoted])
+            level += 1
+
+    def _weighted(self):
+        items = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(len(lv), 2.0 ** h) for h, lv in enumerate(self.levels)])
+        order = np.argsort(items, kind="stable")
+        return items[order], np.cumsum(weights[order])
+
+    # The exact min and max are tracked, so q=0 and q=1 are exact
+    def quantile(self, q):
+        items, cum = self._weighted()
+        if not len(items):
+            return np.nan
+        q = np.asarray(q, dtype=np.float64)
+        pos = np.searchsorted(cum, q * self.n, side="left")
+        result = items[np.minimum(pos, len(items) - 1)]
+        result = np.where(q <= 0, self.min, np.where(q >= 1, self.max, result))
+        return result if result.ndim else float(result)
+
+    # Approximate mid-rank percentile, comparable to rank(pct=True) * 100
+    def percentile_of(self, values):
+        items, cum = self._weighted()
+        values = np.asarray(values, dtype=np.float64)
+        cum = np.r_[0.0, cum]
+        below = cum[np.searchsorted(items, values, side="left")]
+        at_or_below = cum[np.searchsorted(items, values, side="right")]
+        result = (below + at_or_below) / 2 / self.n * 100
+        return np.where(np.isnan(values), np.nan, result)
+
+
+def _bit_length(values):
+    # Exact for uint64 - split so each half converts to float64 without rounding
+    hi = (values >> np.uint64(32)).astype(np.float64)
+    lo = (values & np.uint64(0xFFFFFFFF)).astype(np.float64)
+    return np.where(hi > 0, 32 + np.frexp(hi)[1], np.frexp(lo)[1])
+
+
+def _register_updates(values, p):
+    hashes = pd.util.hash_pandas_object(pd.Series(values), index=False).to_numpy()
+    index = (hashes >> np.uint64(64 - p)).astype(np.int64)
+    rest = hashes & np.uint64((1 << (64 - p)) - 1)
+    rho = (64 - p) - _bit_length(rest) + 1
+    return index, rho.astype(np.uint8)
+
+
+def _estimate(registers):
+    m = registers.shape[-1]
+    alpha = 0.7213 / (1 + 1.079 / m)
+    raw = alpha * m * m / np.sum(np.exp2(-registers.astype(np.float64)), axis=-1)
+    zeros = np.sum(registers == 0, axis=-1)
+    # Linear counting for small cardinalities
+    with np.errstate(divide="ignore"):
+        small = m * np.log(m / np.maximum(zeros, 1))
+    return np.where((raw <= 2.5 * m) & (zeros > 0), small, raw)
+
+
+# HyperLogLog distinct counter - relative error about 1.04 / sqrt(2**p);
+# sketches merge by taking the register-wise maximum
+class HyperLogLog:
+    def __init__(self, p=12):
+        self.p = p
+        self.registers = np.zeros(1 << p, dtype=np.uint8)
+
+    @classmethod
+    def from_error(cls, error=DISTINCT_ERROR):
+        return cls(min(18, max(4, math.ceil(math.log2((1.04 / error) ** 2)))))
+
+    @property
+    def error(self):
+        return 1.04 / math.sqrt(1 << self.p)
+
+    def update(self, values):
+        if len(values):
+            index, rho = _register_updates(values, self.p)
+            np.maximum.at(self.registers, index, rho)
+        return self
+
+    def merge(self, other):
+        np.maximum(self.registers, other.registers, out=self.registers)
+        return self
+
+    def estimate(self):
+        return float(_estimate(self.registers))
+
+
+# Per-group distinct counts in one vectorized pass (e.g. nunique per neighbourhood)
+def grouped_distinct(group_codes, values, n_groups=None, error=DISTINCT_ERROR):
+    p = HyperLogLog.from_error(error).p
+    group_codes = np.asarray(group_codes)
+    n_groups = int(group_codes.max()) + 1 if n_groups is None else n_groups
+    registers = np.zeros((n_groups, 1 << p), dtype=np.uint8)
+    index, rho = _register_updates(values, p)
+    np.maximum.at(registers, (group_codes, index), rho)
+    return _estimate(registers)
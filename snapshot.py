@@ -0,0 +1,152 @@
+import hashlib
+import json
+import os
+
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # fall back to a typed CSV read
+    pa = pq = None
+
+# Only the columns the dashboard reads
+CATEGORICAL_COLUMNS = ["neighbourhood_group", "neighbourhood", "room_type"]
+INTEGER_COLUMNS = ["id", "price", "minimum_nights", "number_of_reviews", "availability_365"]
+FLOAT_COLUMNS = ["latitude", "longitude"]
+SNAPSHOT_COLUMNS = ["id"] + CATEGORICAL_COLUMNS + FLOAT_COLUMNS + INTEGER_COLUMNS[1:]
+METADATA_KEY = b"nyc_airbnb_snapshot"
+
+
+def snapshot_path(csv_path):
+    return os.path.splitext(csv_path)[0] + ".parquet"
+
+
+def arrow_path(csv_path):
+    return os.path.splitext(csv_path)[0] + ".arrow"
+
+
+def file_sha256(path, chunk_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(chunk_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def source_state(csv_path):
+    stat = os.stat(csv_path)
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+# Typed, trimmed CSV parse - categoricals for the text keys, downcast numerics
+def read_typed_csv(csv_path):
+    dtype = {col: "category" for col in CATEGORICAL_COLUMNS}
+    df = pd.read_csv(csv_path, usecols=SNAPSHOT_COLUMNS, dtype=dtype)
+    df = df[df["price"] > 0].drop_duplicates()
+    for col in INTEGER_COLUMNS:
+        df[col] = pd.to_numeric(df[col], downcast="integer")
+    # float32 keeps coordinates to well under a metre
+    for col in FLOAT_COLUMNS:
+        df[col] = pd.to_numeric(df[col], downcast="float")
+    for col in CATEGORICAL_COLUMNS:
+        df[col] = df[col].cat.remove_unused_categories()
+    return df[SNAPSHOT_COLUMNS].reset_index(drop=True)
+
+
+def read_snapshot_metadata(path):
+    if pq is None or not os.path.exists(path):
+        return None
+    if path.endswith(".arrow"):
+        with pa.memory_map(path, "r") as source:
+            metadata = pa.ipc.open_file(source).schema.metadata or {}
+    else:
+        metadata = pq.read_schema(path).metadata or {}
+    if METADATA_KEY not in metadata:
+        return None
+    return json.loads(metadata[METADATA_KEY])
+
+
+def write_snapshot(csv_path, path=None):
+    path = path or snapshot_path(csv_path)
+    state = source_state(csv_path)
+    state["sha256"] = file_sha256(csv_path)
+    state["columns"] = SNAPSHOT_COLUMNS
+    df = read_typed_csv(csv_path)
+
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    metadata = dict(table.schema.metadata or {})
+    metadata[METADATA_KEY] = json.dumps(state).encode()
+    table = table.replace_schema_metadata(metadata)
+
+    # Write to a temp file and swap in so readers never see a partial snapshot
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    if path.endswith(".arrow"):
+        # Uncompressed IPC so the file can be memory-mapped without decoding
+        with pa.OSFile(tmp_path, "wb") as sink:
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+    else:
+        pq.write_table(table, tmp_path, compression="zstd")
+    os.replace(tmp_path, path)
+    return df
+
+
+def snapshot_is_fresh(csv_path, path=None):
+    meta = read_snapshot_metadata(path or snapshot_path(csv_path))
+    # Snapshots written with a different column set are rebuilt
+    if meta is None or meta.get("columns") != SNAPSHOT_COLUMNS:
+        return False
+    state = source_state(csv_path)
+    if meta["size"] == state["size"] and meta["mtime_ns"] == state["mtime_ns"]:
+        return True
+    # Touched but unchanged content (e.g. re-downloaded) keeps the snapshot
+    return meta["size"] == state["size"] and meta["sha256"] == file_sha256(csv_path)
+
+
+# Prefer the snapshot, rebuilding it when the CSV's mtime or hash changes
+def load_listings(csv_path):
+    if pq is None:
+        return read_typed_csv(csv_path)
+    path = snapshot_path(csv_path)
+    if snapshot_is_fresh(csv_path, path):
+        return read_snapshot(path)
+    return write_snapshot(csv_path, path)
+
+
+# Memory-mapped Arrow IPC snapshot - every process maps the same file, so the
+# OS page cache holds a single copy and the returned frame is a read-only view
+def map_listings(csv_path):
+    if pa is None:
+        raise RuntimeError("pyarrow is required for the memory-mapped loader")
+    path = arrow_path(csv_path)
+    if not snapshot_is_fresh(csv_path, path):
+        write_snapshot(csv_path, path)
+    return read_snapshot(path)
+
+
+# Arrow IPC snapshots are memory-mapped (read-only frame), Parquet is decoded
+def read_snapshot(path):
+    if path.endswith(".arrow"):
+        source = pa.memory_map(path, "r")
+        return pa.ipc.open_file(source).read_all().to_pandas(split_blocks=True)
+    return pd.read_parquet(path)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Convert the listings CSV into a typed Parquet snapshot")
+    parser.add_argument("csv_path", nargs="?", default="AB_NYC_2019.csv")
+    parser.add_argument("--force", action="store_true", help="rebuild even if the snapshot is fresh")
+    parser.add_argument("--arrow", action="store_true", help="write the memory-mappable Arrow IPC snapshot")
+    args = parser.parse_args()
+
+    if pq is None:
+        raise SystemExit("pyarrow is required to write snapshots")
+    out = arrow_path(args.csv_path) if args.arrow else snapshot_path(args.csv_path)
+    if args.force or not snapshot_is_fresh(args.csv_path, out):
+        df = write_snapshot(args.csv_path, out)
+        print(f"Wrote {out} ({len(df):,} rows, {os.path.getsize(out) / 1e6:.1f} MB)")
+    else:
+        print(f"{out} is up to date")
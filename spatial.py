@@ -0,0 +1,176 @@
+import numpy as np
+import pandas as pd
+
+from scoring import value_score
+
+EARTH_RADIUS_M = 6_371_000
+CELL_METRES = 250
+MAX_CELLS = 4_000_000
+LISTING_COLUMNS = [
+    "id", "neighbourhood_group", "neighbourhood", "room_type", "latitude", "longitude",
+    "price", "availability_365", "number_of_reviews",
+]
+
+
+# Fixed-grid bucket index over listing coordinates, built once per dataset
+# version. Coordinates are projected to metres around the data's centre, and
+# listings are sorted by cell (column-major), so the cells of one grid column
+# inside a query box are a single contiguous row range.
+class SpatialIndex:
+    def __init__(self, listings, max_reviews_per_listing, cell_metres=CELL_METRES):
+        listings = listings[listings["latitude"].notna() & listings["longitude"].notna()]
+        lat = listings["latitude"].to_numpy(dtype=np.float64)
+        lon = listings["longitude"].to_numpy(dtype=np.float64)
+        self.lat0 = (lat.min() + lat.max()) / 2 if len(lat) else 0.0
+        self.lon0 = (lon.min() + lon.max()) / 2 if len(lon) else 0.0
+        self.max_reviews_per_listing = max_reviews_per_listing
+
+        x, y = self.project(lat, lon)
+        self.x_min = x.min() if len(x) else 0.0
+        self.y_min = y.min() if len(y) else 0.0
+        extent = max(np.ptp(x) if len(x) else 0.0, np.ptp(y) if len(y) else 0.0)
+        # Coarsen the grid rather than allocate an unbounded cell table
+        self.cell_metres = max(cell_metres, extent / np.sqrt(MAX_CELLS))
+        cx, cy = self._cell_coords(x, y)
+        self.nx = int(cx.max()) + 1 if len(cx) else 1
+        self.ny = int(cy.max()) + 1 if len(cy) else 1
+
+        cells = cx * self.ny + cy
+        order = np.argsort(cells, kind="stable")
+        self.x = x[order]
+        self.y = y[order]
+        self._starts = np.searchsorted(cells[order], np.arange(self.nx * self.ny + 1))
+        self.table = listings[LISTING_COLUMNS].iloc[order].reset_index(drop=True)
+        # Room types as integer codes so filtering never converts the column
+        room_types = self.table["room_type"].astype("category")
+        self.room_types = list(room_types.cat.categories)
+        self.room_type_codes = room_types.cat.codes.to_numpy()
+        # Median listing position per borough - the default search centre
+        centres = self.table.groupby("neighbourhood_group", observed=True)[["latitude", "longitude"]].median()
+        self.centres = {str(borough): (float(lat), float(lon)) for borough, (lat, lon) in centres.iterrows()}
+        # Per-listing score on the neighbourhood table's popularity scale
+        self.scores = value_score(
+            self.table["availability_365"], self.table["number_of_reviews"], self.table["price"],
+            max_reviews_per_listing,
+        )
+
+    def __len__(self):
+        return len(self.table)
+
+    # Equirectangular projection - well under 1% error across a city
+    def project(self, lat, lon):
+        lat = np.radians(np.asarray(lat, dtype=np.float64))
+        lon = np.radians(np.asarray(lon, dtype=np.float64))
+        x = EARTH_RADIUS_M * (lon - np.radians(self.lon0)) * np.cos(np.radians(self.lat0))
+        y = EARTH_RADIUS_M * (lat - np.radians(self.lat0))
+        return x, y
+
+    def unproject(self, x, y):
+        lat = self.lat0 + np.degrees(np.asarray(y) / EARTH_RADIUS_M)
+        lon = self.lon0 + np.degrees(np.asarray(x) / (EARTH_RADIUS_M * np.cos(np.radians(self.lat0))))
+        return lat, lon
+
+    def _cell_coords(self, x, y):
+        cx = ((x - self.x_min) // self.cell_metres).astype(np.int64)
+        cy = ((y - self.y_min) // self.cell_metres).astype(np.int64)
+        return cx, cy
+
+    # Row positions of every listing in the cells overlapping the query box
+    def _candidates(self, x, y, radius):
+        (cx_lo, cx_hi), (cy_lo, cy_hi) = self._cell_coords(np.array([x - radius, x + radius]),
+                                                           np.array([y - radius, y + radius]))
+        cx_lo, cx_hi = max(int(cx_lo), 0), min(int(cx_hi), self.nx - 1)
+        cy_lo, cy_hi = max(int(cy_lo), 0), min(int(cy_hi), self.ny - 1)
+        if cx_lo > cx_hi or cy_lo > cy_hi:
+            return np.empty(0, dtype=np.int64)
+        columns = np.arange(cx_lo, cx_hi + 1) * self.ny
+        starts = self._starts[columns + cy_lo]
+        stops = self._starts[columns + cy_hi + 1]
+        return np.concatenate([np.arange(start, stop) for start, stop in zip(starts, stops)])
+
+    def _filter(self, rows, room_type):
+        if room_type is None:
+            return rows
+        if room_type not in self.room_types:
+            return rows[:0]
+        return rows[self.room_type_codes[rows] == self.room_types.index(room_type)]
+
+    # Listings within radius_m of the point: (row positions, distances in metres)
+    def within(self, lat, lon, radius_m, room_type=None):
+        x, y = self.project(lat, lon)
+        rows = self._filter(self._candidates(x, y, radius_m), room_type)
+        distances = np.hypot(self.x[rows] - x, self.y[rows] - y)
+        keep = distances <= radius_m
+        return rows[keep], distances[keep]
+
+    # Value score of the listings around a point, computed exactly like a
+    # neighbourhood's so the two are directly comparable
+    def radius_summary(self, lat, lon, radius_m, room_type=None):
+        rows, _ = self.within(lat, lon, radius_m, room_type)
+        if not len(rows):
+            return {"listings": 0, "avg_price": np.nan, "avg_availability": np.nan,
+                    "reviews_per_listing": np.nan, "value_score": np.nan}
+        part = self.table.iloc[rows]
+        avg_price = float(part["price"].mean())
+        avg_availability = float(part["availability_365"].mean())
+        reviews_per_listing = float(part["number_of_reviews"].sum() / len(part))
+        return {
+            "listings": len(part),
+            "avg_price": avg_price,
+            "avg_availability": avg_availability,
+            "reviews_per_listing": reviews_per_listing,
+            "value_score": float(value_score(
+                avg_availability, reviews_per_listing, avg_price, self.max_reviews_per_listing
+            )),
+        }
+
+    # k nearest listings, searching outwards ring by ring until the k-th
+    # distance is inside the searched radius
+    def nearest(self, lat, lon, k=10, room_type=None):
+        x, y = self.project(lat, lon)
+        max_radius = np.hypot(self.nx, self.ny) * self.cell_metres + np.hypot(x - self.x_min, y - self.y_min)
+        radius = self.cell_metres
+        while True:
+            rows = self._filter(self._candidates(x, y, radius), room_type)
+            distances = np.hypot(self.x[rows] - x, self.y[rows] - y)
+            inside = distances <= radius
+            if inside.sum() >= k or radius >= max_radius:
+                break
+            radius *= 2
+        if len(rows) > k:
+            part = np.argpartition(distances, k - 1)[:k]
+            rows, distances = rows[part], distances[part]
+        order = np.argsort(distances, kind="stable")
+        result = self.table.iloc[rows[order]].copy()
+        result["distance_m"] = distances[order]
+        result["value_score"] = self.scores[rows[order]]
+        return result.reset_index(drop=True)
+
+    # Listings aggregated into square cells of cell_metres, scored like
+    # neighbourhoods - the grid heatmap's data
+    def grid(self, cell_metres=500, borough="All"):
+        mask = slice(None) if borough == "All" else (self.table["neighbourhood_group"] == borough).to_numpy()
+        x, y = self.x[mask], self.y[mask]
+        table = self.table[mask] if borough != "All" else self.table
+        gx = ((x - self.x_min) // cell_metres).astype(np.int64)
+        gy = ((y - self.y_min) // cell_metres).astype(np.int64)
+        cells = pd.DataFrame({
+            "gx": gx, "gy": gy,
+            "price": table["price"].to_numpy(),
+            "availability_365": table["availability_365"].to_numpy(),
+            "number_of_reviews": table["number_of_reviews"].to_numpy(),
+        }).groupby(["gx", "gy"]).agg(
+            listings=("price", "size"),
+            avg_price=("price", "mean"),
+            avg_availability=("availability_365", "mean"),
+            total_reviews=("number_of_reviews", "sum"),
+        ).reset_index()
+        cells["reviews_per_listing"] = cells["total_reviews"] / cells["listings"]
+        cells["value_score"] = value_score(
+            cells["avg_availability"], cells["reviews_per_listing"], cells["avg_price"],
+            self.max_reviews_per_listing,
+        )
+        cells["latitude"], cells["longitude"] = self.unproject(
+            self.x_min + (cells["gx"] + 0.5) * cell_metres, self.y_min + (cells["gy"] + 0.5) * cell_metres
+        )
+        return cells
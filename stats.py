@@ -0,0 +1,136 @@
+from collections import Counter
+
+import numpy as np
+import pandas as pd
+
+from sketches import DISTINCT_ERROR, QUANTILE_ERROR, HyperLogLog, KLLSketch
+
+SUMMARY_QUANTILES = (0.25, 0.5, 0.75)
+
+
+# Exact linear-interpolated quantiles (as Series.quantile) from one
+# np.partition call over the order statistics they need, plus min and max
+def order_stats(values, quantiles=SUMMARY_QUANTILES):
+    n = len(values)
+    positions = [q * (n - 1) for q in quantiles]
+    kth = sorted({0, n - 1} | {int(np.floor(p)) for p in positions} | {int(np.ceil(p)) for p in positions})
+    part = np.partition(values, kth)
+    result = {"min": part[0], "max": part[n - 1]}
+    for q, pos in zip(quantiles, positions):
+        lo, hi = int(np.floor(pos)), int(np.ceil(pos))
+        result[q] = part[lo] + (part[hi] - part[lo]) * (pos - lo)
+    return result
+
+
+# Mean and sample std (ddof=1) from the sum and sum of squares of one pass
+def moments(values):
+    n = len(values)
+    total = values.sum()
+    mean = total / n
+    var = (np.dot(values, values) - total * mean) / (n - 1) if n > 1 else np.nan
+    return {"sum": total, "mean": mean, "std": np.sqrt(max(var, 0.0))}
+
+
+def category_counts(series):
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        counts = np.bincount(series.cat.codes[series.cat.codes >= 0], minlength=len(series.cat.categories))
+        return series.cat.categories, counts
+    codes, uniques = pd.factorize(series, sort=True)
+    return uniques, np.bincount(codes[codes >= 0], minlength=len(uniques))
+
+
+# Everything the Dataset Summary page shows, as one compact record. The
+# approximate mode swaps exact quantiles and distinct counts for sketches.
+def summarize_listings(df, approx=False, quantile_error=QUANTILE_ERROR, distinct_error=DISTINCT_ERROR):
+    if approx:
+        return SummarySketch(quantile_error, distinct_error).update(df).to_summary()
+    price = df["price"].to_numpy(dtype=np.float64)
+    price_order = order_stats(price)
+    price_moments = moments(price)
+    reviews = df["number_of_reviews"].to_numpy(dtype=np.float64)
+    room_types, room_counts = category_counts(df["room_type"])
+    _, neigh_counts = category_counts(df["neighbourhood"])
+    _, group_counts = category_counts(df["neighbourhood_group"])
+
+    return {
+        "listings": len(df),
+        "neighbourhoods": int((neigh_counts > 0).sum()),
+        "boroughs": int((group_counts > 0).sum()),
+        "price_min": price_order["min"],
+        "price_q1": price_order[0.25],
+        "price_median": price_order[0.5],
+        "price_q3": price_order[0.75],
+        "price_max": price_order["max"],
+        "price_mean": price_moments["mean"],
+        "price_std": price_moments["std"],
+        "price_iqr": price_order[0.75] - price_order[0.25],
+        "availability_mean": df["availability_365"].to_numpy(dtype=np.float64).mean(),
+        "reviews_total": int(reviews.sum()),
+        "reviews_per_listing": reviews.sum() / len(df),
+        "most_common_room": room_types[int(np.argmax(room_counts))],
+    }
+
+
+# Mergeable Dataset Summary state - KLL for price quantiles, HyperLogLog for
+# distinct neighbourhoods/boroughs, plain sums for the rest. Sketches built
+# per chunk, borough or file combine with merge().
+class SummarySketch:
+    def __init__(self, quantile_error=QUANTILE_ERROR, distinct_error=DISTINCT_ERROR):
+        self.price = KLLSketch.from_error(quantile_error)
+        self.neighbourhoods = HyperLogLog.from_error(distinct_error)
+        self.boroughs = HyperLogLog.from_error(distinct_error)
+        self.room_types = Counter()
+        self.listings = 0
+        self.price_sum = 0.0
+        self.price_sumsq = 0.0
+        self.availability_sum = 0.0
+        self.reviews_sum = 0
+
+    def update(self, df):
+        price = df["price"].to_numpy(dtype=np.float64)
+        self.price.update(price)
+        self.neighbourhoods.update(df["neighbourhood"])
+        self.boroughs.update(df["neighbourhood_group"])
+        room_types, counts = category_counts(df["room_type"])
+        self.room_types.update(dict(zip(map(str, room_types), counts.tolist())))
+        self.listings += len(df)
+        self.price_sum += price.sum()
+        self.price_sumsq += np.dot(price, price)
+        self.availability_sum += df["availability_365"].to_numpy(dtype=np.float64).sum()
+        self.reviews_sum += int(df["number_of_reviews"].sum())
+        return self
+
+    def merge(self, other):
+        self.price.merge(other.price)
+        self.neighbourhoods.merge(other.neighbourhoods)
+        self.boroughs.merge(other.boroughs)
+        self.room_types.update(other.room_types)
+        self.listings += other.listings
+        self.price_sum += other.price_sum
+        self.price_sumsq += other.price_sumsq
+        self.availability_sum += other.availability_sum
+        self.reviews_sum += other.reviews_sum
+        return self
+
+    def to_summary(self):
+        n = self.listings
+        q1, median, q3 = self.price.quantile(list(SUMMARY_QUANTILES))
+        mean = self.price_sum / n
+        var = (self.price_sumsq - self.price_sum * mean) / (n - 1) if n > 1 else np.nan
+        return {
+            "listings": n,
+            "neighbourhoods": int(round(self.neighbourhoods.estimate())),
+            "boroughs": int(round(self.boroughs.estimate())),
+            "price_min": self.price.quantile(0.0),
+            "price_q1": q1,
+            "price_median": median,
+            "price_q3": q3,
+            "price_max": self.price.quantile(1.0),
+            "price_mean": mean,
+            "price_std": np.sqrt(max(var, 0.0)),
+            "price_iqr": q3 - q1,
+            "availability_mean": self.availability_sum / n,
+            "reviews_total": self.reviews_sum,
+            "reviews_per_listing": self.reviews_sum / n,
+            "most_common_room": max(sorted(self.room_types), key=self.room_types.get),
+        }
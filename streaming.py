@@ -0,0 +1,90 @@
+import numpy as np
+import pandas as pd
+
+from incremental import NeighbourhoodAggregator
+from snapshot import CATEGORICAL_COLUMNS, FLOAT_COLUMNS, INTEGER_COLUMNS, SNAPSHOT_COLUMNS
+from stats import SummarySketch
+
+CHUNK_SIZE = 200_000
+# One dtype per column for the whole file - inferred per chunk, a blank value
+# turns a chunk's integers into floats and hash_pandas_object then digests
+# 100 and 100.0 differently, so cross-chunk duplicates would be missed
+CHUNK_DTYPES = {col: str for col in CATEGORICAL_COLUMNS} | {col: "float64" for col in INTEGER_COLUMNS + FLOAT_COLUMNS}
+
+
+# Row digests seen so far, kept as sorted uint64 runs (8 bytes per distinct
+# row). A new run is merged into the previous one while it is at least as
+# large, so there are only O(log n) runs to probe.
+class DigestSet:
+    def __init__(self):
+        self._runs = []
+
+    def __len__(self):
+        return sum(len(run) for run in self._runs)
+
+    @property
+    def nbytes(self):
+        return sum(run.nbytes for run in self._runs)
+
+    def __contains__(self, digest):
+        return bool(self.seen(np.array([digest], dtype=np.uint64))[0])
+
+    def seen(self, digests):
+        mask = np.zeros(len(digests), dtype=bool)
+        for run in self._runs:
+            pos = np.searchsorted(run, digests)
+            pos[pos == len(run)] = 0
+            mask |= run[pos] == digests
+        return mask
+
+    # Mark digests as seen and return the mask of rows not seen before
+    def add(self, digests):
+        first = ~pd.Series(digests).duplicated().to_numpy()
+        new = first & ~self.seen(digests)
+        run = np.sort(digests[new])
+        while self._runs and len(self._runs[-1]) <= len(run):
+            run = np.concatenate([self._runs.pop(), run])
+            run.sort()
+        if len(run):
+            self._runs.append(run)
+        return new
+
+
+# Clean chunks with price > 0 and no row repeated across the whole file
+def iter_clean_chunks(path, chunksize=CHUNK_SIZE, dedupe=True, stats=None):
+    digests = DigestSet() if dedupe else None
+    stats = stats if stats is not None else {}
+    stats.update(rows_read=0, rows_kept=0, invalid_price=0, duplicates=0)
+    for chunk in pd.read_csv(path, usecols=SNAPSHOT_COLUMNS, dtype=CHUNK_DTYPES, chunksize=chunksize):
+        stats["rows_read"] += len(chunk)
+        valid = chunk["price"] > 0
+        stats["invalid_price"] += int((~valid).sum())
+        chunk = chunk[valid]
+        if digests is not None:
+            new = digests.add(pd.util.hash_pandas_object(chunk[SNAPSHOT_COLUMNS], index=False).to_numpy())
+            stats["duplicates"] += int((~new).sum())
+            chunk = chunk[new]
+            stats["digest_bytes"] = digests.nbytes
+        stats["rows_kept"] += len(chunk)
+        yield chunk
+
+
+# Feed per-neighbourhood aggregates straight from the chunks - only one chunk
+# of listings is ever held in memory
+def stream_aggregates(path, chunksize=CHUNK_SIZE, dedupe=True, stats=None):
+    agg = NeighbourhoodAggregator()
+    for chunk in iter_clean_chunks(path, chunksize, dedupe, stats):
+        agg.append(chunk)
+    return agg
+
+
+def stream_neigh_df(path, chunksize=CHUNK_SIZE, dedupe=True, stats=None):
+    return stream_aggregates(path, chunksize, dedupe, stats).to_neigh_df()
+
+
+# Approximate Dataset Summary over a file of any size, one sketch per chunk
+def stream_summary(path, chunksize=CHUNK_SIZE, dedupe=True, stats=None, **errors):
+    summary = SummarySketch(**errors)
+    for chunk in iter_clean_chunks(path, chunksize, dedupe, stats):
+        summary.merge(SummarySketch(**errors).update(chunk))
+    return summary.to_summary()
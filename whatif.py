@@ -0,0 +1,81 @@
+import itertools
+
+import numpy as np
+import pandas as pd
+
+from scoring import value_components, value_percentile
+
+COMPONENTS = ["availability", "popularity", "price_efficiency"]
+BASELINE_WEIGHTS = (1.0, 1.0, 1.0)
+WEIGHT_STEPS = np.round(np.arange(0, 2.01, 0.25), 2)
+
+
+# Re-scores every neighbourhood with per-component exponents,
+#   score = 100 × availability^wa × popularity^wp × price_efficiency^we,
+# as one weighted sum over precomputed log components - no groupby rerun.
+# Weights of 1 give the standard value_score.
+class WhatIfScorer:
+    def __init__(self, neigh_df):
+        self.table = neigh_df.reset_index(drop=True)
+        components = np.vstack(value_components(
+            self.table["avg_availability"], self.table["reviews_per_listing"], self.table["avg_price"]
+        ))
+        # Zero components are kept out of the logs so that 0 ** 0 stays 1
+        self._zero = components == 0
+        with np.errstate(divide="ignore"):
+            self._logs = np.where(self._zero, 0.0, np.log(components))
+        self._groups = self.table["neighbourhood_group"].astype(str).to_numpy()
+        self.baseline = self.scores(BASELINE_WEIGHTS)
+        self._baseline_rank = self._ranks(self.baseline)
+
+    # weights is one (wa, wp, we) triple, or an (m, 3) array giving (m, n) scores
+    def scores(self, weights):
+        weights = np.asarray(weights, dtype=np.float64)
+        zeroed = ((weights > 0).astype(np.float64) @ self._zero) > 0
+        with np.errstate(over="ignore"):
+            return np.where(zeroed, 0.0, np.exp(weights @ self._logs)) * 100
+
+    @staticmethod
+    def _ranks(scores):
+        return pd.Series(scores).rank(ascending=False, method="first").to_numpy()
+
+    # Neighbourhoods re-ranked under the given scores, with the rank change
+    # against the standard formula (positive = moved up). Ranks are within
+    # the borough; percentiles are across all neighbourhoods like value_percentile.
+    def ranking(self, scores, borough="All", n=None):
+        mask = np.ones(len(scores), dtype=bool) if borough == "All" else self._groups == borough
+        rows = np.flatnonzero(mask)
+        order = rows[np.argsort(-scores[rows], kind="stable")]
+        if n is not None:
+            order = order[:n]
+        new_rank = self._ranks(np.where(mask, scores, -np.inf))[order]
+        baseline_rank = self._ranks(np.where(mask, self.baseline, -np.inf))[order]
+        result = self.table.iloc[order].copy()
+        result["what_if_score"] = scores[order]
+        result["what_if_percentile"] = value_percentile(scores)[order]
+        result["what_if_rank"] = new_rank.astype(int)
+        result["rank_change"] = (baseline_rank - new_rank).astype(int)
+        return result.reset_index(drop=True)
+
+
+# Scores for every weight combination on a fixed grid, computed in one matrix
+# product up front so a slider change is a row lookup
+class WhatIfGrid:
+    def __init__(self, scorer, steps=WEIGHT_STEPS):
+        self.scorer = scorer
+        self.steps = np.asarray(steps, dtype=np.float64)
+        self.weights = np.array(list(itertools.product(self.steps, repeat=len(COMPONENTS))))
+        self.grid = scorer.scores(self.weights)
+
+    @property
+    def nbytes(self):
+        return self.grid.nbytes
+
+    # Nearest grid point to the requested weights
+    def snap(self, weights):
+        pos = np.abs(self.steps[None, :] - np.asarray(weights, dtype=np.float64)[:, None]).argmin(axis=1)
+        return tuple(float(step) for step in self.steps[pos]), int(np.ravel_multi_index(pos, (len(self.steps),) * len(COMPONENTS)))
+
+    def scores(self, weights):
+        snapped, row = self.snap(weights)
+        return snapped, self.grid[row]